@@ -0,0 +1,108 @@
+"""
+Sync vs async database path throughput benchmark
+
+Serves the same task read through a sync `def` route backed by a regular
+Session and an `async def` route backed by an AsyncSession, configured like
+database.py, then drives each in-process over ASGI with many concurrent
+clients. With SQLite there is no network wait for async to overlap and
+aiosqlite adds a thread hop per call, so the sync route comes out ahead and
+the API keeps sync routes on the threadpool.
+
+Usage:
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/bench_async_db.py --clients 500 --requests 10000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+import crud
+import schemas
+from database import init_db
+
+
+def build_app(db_path: str) -> FastAPI:
+    engine = create_engine(
+        f"sqlite:///{db_path}", connect_args={"check_same_thread": False}, pool_size=20, max_overflow=20
+    )
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{db_path}", poolclass=AsyncAdaptedQueuePool, pool_size=20, max_overflow=20
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    app = FastAPI()
+
+    # The sync session is scoped inside the handler: with a yield dependency
+    # (get_db), sessions wait for a free threadpool worker to close, and at
+    # hundreds of clients that starves the connection pool until it times out.
+    @app.get("/sync/tasks/{task_id}", response_model=schemas.Task)
+    def read_task_sync(task_id: int):
+        with SessionLocal() as db:
+            return crud.get_task(db, task_id)
+
+    @app.get("/async/tasks/{task_id}", response_model=schemas.Task)
+    async def read_task_async(task_id: int, db: AsyncSession = Depends(get_async_db)):
+        return await db.run_sync(crud.get_task, task_id)
+
+    return app, engine
+
+
+def seed(engine, tasks: int):
+    init_db(bind=engine)
+    db = sessionmaker(bind=engine)()
+    user = crud.create_user(db, schemas.UserCreate(email="bench@example.com", username="bench", password="bench"))
+    crud.create_tasks_bulk(db, [schemas.TaskCreate(title=f"Task {i}") for i in range(tasks)], user.id)
+    db.close()
+
+
+async def drive(app: FastAPI, prefix: str, clients: int, requests: int, tasks: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    remaining = iter(range(requests))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            for i in remaining:
+                response = await client.get(f"{prefix}/tasks/{i % tasks + 1}")
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--tasks", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app, engine = build_app(os.path.join(tmp, "bench.db"))
+        seed(engine, args.tasks)
+
+        print(f"{args.requests} requests, {args.clients} concurrent clients")
+        for label, prefix in (("sync ", "/sync"), ("async", "/async")):
+            elapsed = asyncio.run(drive(app, prefix, args.clients, args.requests, args.tasks))
+            print(f"  {label}: {args.requests / elapsed:8.0f} req/s ({elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Endpoint statistics over a large log window, serial versus chunked in a process pool
+
+Writes --megabytes of request records shaped like log_requests in main.py to
+a temporary app.log, then times log_scan.scan_endpoint_stats in the calling
+process and across --workers processes. The speedup is bounded by the number
+of cores available.
+
+Usage:
+    python benchmarks/bench_log_scan.py --megabytes 200 --workers 4
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import log_scan
+
+
+def write_log(path: str, megabytes: int):
+    start = datetime(2024, 1, 1)
+    target = megabytes * 1024 * 1024
+    with open(path, "w") as f:
+        i = 0
+        while f.tell() < target:
+            f.write(json.dumps({
+                "timestamp": (start + timedelta(milliseconds=10 * i)).isoformat(timespec="milliseconds"),
+                "level": "INFO",
+                "logger": "main",
+                "module": "main",
+                "message": f"Request completed: GET /api/tasks/{i} - 200",
+                "request_id": f"{i:032x}",
+                "method": "GET",
+                "endpoint": f"/api/tasks/{i}",
+                "route": "/api/tasks/{task_id}" if i % 4 else "/api/tasks/",
+                "client_ip": "127.0.0.1",
+                "status_code": 200,
+                "duration_ms": float(i % 250) / 10,
+                "sample_weight": 1,
+            }) + "\n")
+            i += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--megabytes", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "app.log")
+        write_log(path, args.megabytes)
+
+        start = time.perf_counter()
+        serial = log_scan.scan_endpoint_stats(path)
+        serial_seconds = time.perf_counter() - start
+
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            start = time.perf_counter()
+            parallel = log_scan.scan_endpoint_stats(path, executor=executor)
+            parallel_seconds = time.perf_counter() - start
+
+        assert {k: v.count for k, v in serial.items()} == {k: v.count for k, v in parallel.items()}
+        print(f"serial   {serial_seconds:7.2f} s  {args.megabytes / serial_seconds:7.1f} MB/s")
+        print(
+            f"parallel {parallel_seconds:7.2f} s  {args.megabytes / parallel_seconds:7.1f} MB/s  "
+            f"({args.workers} workers, {serial_seconds / parallel_seconds:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
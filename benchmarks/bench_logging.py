@@ -0,0 +1,127 @@
+"""
+Per-request logging overhead with direct handlers versus the queued pipeline
+
+Each simulated request logs the two records log_requests in main.py writes,
+to a stream handler and a RotatingFileHandler in a temporary directory.
+"direct" attaches the handlers to the logger as logging_config used to;
+"queued" goes through BoundedQueueHandler and a DrainingQueueListener. The
+time measured is what the calling thread (the event loop, in the app) spends.
+--stall-ms adds a pause every --stall-every writes to model disk or rotation
+stalls, and --interval-ms paces requests like a server at a steady rate.
+
+Usage:
+    python benchmarks/bench_logging.py --requests 20000 --interval-ms 0.2 --stall-ms 20 --stall-every 1000
+"""
+import argparse
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logging_config import BoundedQueueHandler, DrainingQueueListener, JSONFormatter
+
+
+class StallingFileHandler(logging.handlers.RotatingFileHandler):
+    def __init__(self, *args, stall_ms: float = 0, stall_every: int = 0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stall_seconds = stall_ms / 1000
+        self.stall_every = stall_every
+        self.writes = 0
+
+    def emit(self, record):
+        self.writes += 1
+        if self.stall_every and self.writes % self.stall_every == 0:
+            time.sleep(self.stall_seconds)
+        super().emit(record)
+
+
+def make_handlers(tmp: str, args) -> list:
+    handlers = [
+        logging.StreamHandler(open(os.devnull, "w")),
+        StallingFileHandler(
+            os.path.join(tmp, "app.log"), maxBytes=10485760, backupCount=5,
+            stall_ms=args.stall_ms, stall_every=args.stall_every,
+        ),
+    ]
+    for handler in handlers:
+        handler.setFormatter(JSONFormatter())
+    return handlers
+
+
+def run(mode: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        handlers = make_handlers(tmp, args)
+        logger = logging.getLogger(f"bench.{mode}")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        listener = None
+        queue_handler = None
+        if mode == "queued":
+            log_queue = queue.Queue(args.queue_size)
+            queue_handler = BoundedQueueHandler(log_queue, policy=args.policy)
+            listener = DrainingQueueListener(log_queue, *handlers)
+            listener.start()
+            logger.addHandler(queue_handler)
+        else:
+            for handler in handlers:
+                logger.addHandler(handler)
+
+        samples = []
+        for i in range(args.requests):
+            start = time.perf_counter()
+            logger.info(
+                "Incoming request: GET /api/tasks/",
+                extra={"method": "GET", "endpoint": "/api/tasks/", "client_ip": "127.0.0.1"},
+            )
+            logger.info(
+                "Request completed: GET /api/tasks/ - 200",
+                extra={"method": "GET", "endpoint": "/api/tasks/", "status_code": 200, "duration_ms": 1.5},
+            )
+            samples.append(time.perf_counter() - start)
+            if args.interval_ms:
+                time.sleep(args.interval_ms / 1000)
+
+        drain_start = time.perf_counter()
+        if listener is not None:
+            listener.stop()
+        drain = time.perf_counter() - drain_start
+        for handler in logger.handlers[:]:
+            logger.removeHandler(handler)
+        for handler in handlers:
+            handler.close()
+
+        samples.sort()
+        return {
+            "mean_us": sum(samples) / len(samples) * 1e6,
+            "p99_us": samples[int(len(samples) * 0.99)] * 1e6,
+            "max_us": samples[-1] * 1e6,
+            "drain_ms": drain * 1000,
+            "dropped": queue_handler.dropped if queue_handler else 0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--interval-ms", type=float, default=0.2)
+    parser.add_argument("--stall-ms", type=float, default=20)
+    parser.add_argument("--stall-every", type=int, default=1000)
+    parser.add_argument("--queue-size", type=int, default=10000)
+    parser.add_argument("--policy", choices=["drop", "block"], default="drop")
+    args = parser.parse_args()
+
+    for mode in ("direct", "queued"):
+        result = run(mode, args)
+        print(
+            f"{mode:7s} mean {result['mean_us']:7.1f} us  p99 {result['p99_us']:7.1f} us  "
+            f"max {result['max_us']:9.1f} us  drain {result['drain_ms']:7.1f} ms  dropped {result['dropped']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
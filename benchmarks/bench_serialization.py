@@ -0,0 +1,80 @@
+"""
+Serialization cost of List[schemas.Task] responses, before and after render_json
+
+"response_model" reproduces FastAPI's default path for a route returning ORM
+rows: validate through the response model, jsonable_encoder, then stdlib
+json in JSONResponse. "render_json" is the path the cached list routes in
+main.py use: one precompiled TypeAdapter validating and dumping to bytes.
+
+Usage:
+    python benchmarks/bench_serialization.py --rows 100 1000 10000 --seconds 2
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+
+import models
+import schemas
+from main import render_json, response_adapter
+
+
+def response_model_path(tasks) -> bytes:
+    validated = response_adapter(List[schemas.Task]).validate_python(tasks, from_attributes=True)
+    return json.dumps(
+        jsonable_encoder(validated), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode()
+
+
+def render_json_path(tasks) -> bytes:
+    return render_json(List[schemas.Task], tasks)
+
+
+def make_tasks(count: int) -> list:
+    now = datetime.utcnow()
+    return [
+        models.Task(
+            id=i, title=f"Task {i}", description="Benchmark task description", completed=i % 3 == 0,
+            priority=("low", "medium", "high")[i % 3], owner_id=1, created_at=now, updated_at=now,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def measure(func, tasks, seconds: float) -> float:
+    """Mean milliseconds per call over roughly `seconds` of repeated calls"""
+    func(tasks)
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        func(tasks)
+        calls += 1
+    return (time.perf_counter() - start) / calls * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--seconds", type=float, default=2)
+    args = parser.parse_args()
+
+    for count in args.rows:
+        tasks = make_tasks(count)
+        assert json.loads(response_model_path(tasks)) == json.loads(render_json_path(tasks))
+        before = measure(response_model_path, tasks, args.seconds)
+        after = measure(render_json_path, tasks, args.seconds)
+        print(
+            f"{count:6d} rows  response_model {before:9.3f} ms  "
+            f"render_json {after:9.3f} ms  speedup {before / after:5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Mixed read/write throughput for each SQLite engine profile
+
+Runs worker threads against a fresh database per profile in database.py's
+SQLITE_PROFILES; each worker mixes task reads with single-row updates and
+records "database is locked" failures.
+
+Usage:
+    python benchmarks/bench_sqlite_profile.py --threads 8 --seconds 5 --write-ratio 0.2
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+import crud
+import schemas
+from database import SQLITE_PROFILES, apply_sqlite_pragmas, init_db
+
+
+def run_profile(name: str, pragmas: dict, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            connect_args={"check_same_thread": False},
+            pool_size=args.threads,
+        )
+
+        event.listen(
+            engine, "connect",
+            lambda dbapi_connection, connection_record: apply_sqlite_pragmas(dbapi_connection, connection_record, pragmas)
+        )
+
+        init_db(bind=engine)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with SessionLocal() as db:
+            user = crud.create_user(db, schemas.UserCreate(email="bench@example.com", username="bench", password="x"))
+            crud.create_tasks_bulk(db, [schemas.TaskCreate(title=f"Task {i}") for i in range(args.tasks)], user.id)
+
+        counts = {"reads": 0, "writes": 0, "locked": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + args.seconds
+
+        def worker():
+            local = {"reads": 0, "writes": 0, "locked": 0}
+            rng = random.Random()
+            with SessionLocal() as db:
+                while time.perf_counter() < deadline:
+                    task_id = rng.randint(1, args.tasks)
+                    try:
+                        if rng.random() < args.write_ratio:
+                            crud.update_task(db, task_id, schemas.TaskUpdate(completed=rng.random() < 0.5))
+                            local["writes"] += 1
+                        else:
+                            crud.get_task(db, task_id)
+                            db.rollback()
+                            local["reads"] += 1
+                    except OperationalError as e:
+                        db.rollback()
+                        if "locked" not in str(e):
+                            raise
+                        local["locked"] += 1
+            with lock:
+                for key, value in local.items():
+                    counts[key] += value
+
+        threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+        return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--tasks", type=int, default=10000)
+    args = parser.parse_args()
+
+    for name, pragmas in SQLITE_PROFILES.items():
+        counts = run_profile(name, pragmas, args)
+        ops = counts["reads"] + counts["writes"]
+        print(
+            f"{name:8s} {ops / args.seconds:8.0f} ops/s  "
+            f"reads={counts['reads']} writes={counts['writes']} locked={counts['locked']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
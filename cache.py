@@ -0,0 +1,150 @@
+"""
+In-process response cache for read endpoints
+
+Serialized GET responses are kept in a bounded LRU with a TTL and a byte
+cap. Each entry carries tags (e.g. "task:12", "owner:3") so writes can drop
+exactly the entries they affect. The cache is per process: with several
+uvicorn workers, the TTL bounds how stale another worker's entry can be.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+# Rough per-entry bookkeeping cost on top of the key, body and headers
+ENTRY_OVERHEAD_BYTES = 256
+
+class CachedResponse:
+    __slots__ = ("body", "headers", "tags", "expires_at", "size")
+
+    def __init__(self, body: bytes, headers: Dict[str, str], tags: frozenset, expires_at: float, size: int):
+        self.body = body
+        self.headers = headers
+        self.tags = tags
+        self.expires_at = expires_at
+        self.size = size
+
+class ResponseCache:
+    """Thread-safe LRU + TTL cache with tag invalidation and memory accounting"""
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024,
+                 ttl_seconds: float = 5.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._tags: Dict[str, set] = {}
+        self._bytes = 0
+        # Bumped by every invalidation so fills that raced a write can be refused
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0 and self.max_bytes > 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= self._clock():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def fill_token(self) -> int:
+        """Take before reading from the database and pass to set()"""
+        return self._generation
+
+    def set(self, key: str, body: bytes, tags: Iterable[str] = (), headers: Dict[str, str] = None,
+            token: int = None):
+        """Store a response; skipped if an invalidation happened since token was taken"""
+        if not self.enabled:
+            return
+        headers = dict(headers or {})
+        size = (
+            len(key) + len(body) + ENTRY_OVERHEAD_BYTES
+            + sum(len(name) + len(value) for name, value in headers.items())
+        )
+        if size > self.max_bytes:
+            return
+        entry = CachedResponse(body, headers, frozenset(tags), self._clock() + self.ttl_seconds, size)
+        with self._lock:
+            if token is not None and token != self._generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += size
+            for tag in entry.tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, *tags: str):
+        """Drop every entry carrying any of the given tags"""
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str):
+        # Caller holds the lock
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+response_cache = ResponseCache(
+    max_entries=int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 10000)),
+    max_bytes=int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    ttl_seconds=float(os.environ.get("RESPONSE_CACHE_TTL", 5.0)),
+)
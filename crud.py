@@ -1,12 +1,17 @@
 """
 CRUD operations for database
 """
+import re
+from datetime import datetime
+from typing import List, Tuple
+from sqlalchemy import column, delete, func, insert, literal_column, select, table, text, tuple_, update
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 import models
 import schemas
+from security import hash_password, verify_password  # noqa: F401 (verify_password re-exported)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Keeps IN (...) lists well below SQLite's bound parameter limit
+BULK_ID_CHUNK_SIZE = 500
 
 # User operations
 def get_user(db: Session, user_id: int):
@@ -18,11 +23,25 @@ def get_user_by_email(db: Session, email: str):
 def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.User).offset(skip).limit(limit).all()
+def get_existing_user_ids(db: Session, user_ids):
+    """The subset of user_ids that belong to existing users"""
+    user_ids = list(user_ids)
+    existing = set()
+    for start in range(0, len(user_ids), BULK_ID_CHUNK_SIZE):
+        chunk = user_ids[start:start + BULK_ID_CHUNK_SIZE]
+        existing.update(db.scalars(select(models.User.id).where(models.User.id.in_(chunk))))
+    return existing
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = pwd_context.hash(user.password)
+def get_users(db: Session, skip: int = 0, limit: int = 100, after_id: int = None):
+    query = db.query(models.User).order_by(models.User.id)
+    if after_id is not None:
+        # Keyset mode: seek past the cursor instead of scanning skipped rows
+        return query.filter(models.User.id > after_id).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
+
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: str = None):
+    if hashed_password is None:
+        hashed_password = hash_password(user.password)
     db_user = models.User(
         email=user.email,
         username=user.username,
@@ -33,17 +52,17 @@ def create_user(db: Session, user: schemas.UserCreate):
     db.refresh(db_user)
     return db_user
 
-def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
-
 # Task operations
 def get_task(db: Session, task_id: int):
     return db.query(models.Task).filter(models.Task.id == task_id).first()
 
-def get_tasks(db: Session, skip: int = 0, limit: int = 100, user_id: int = None):
-    query = db.query(models.Task)
+def get_tasks(db: Session, skip: int = 0, limit: int = 100, user_id: int = None, after_id: int = None):
+    query = db.query(models.Task).order_by(models.Task.id)
     if user_id:
         query = query.filter(models.Task.owner_id == user_id)
+    if after_id is not None:
+        # Keyset mode: seek past the cursor instead of scanning skipped rows
+        return query.filter(models.Task.id > after_id).limit(limit).all()
     return query.offset(skip).limit(limit).all()
 
 def get_tasks_by_priority(db: Session, priority: str, user_id: int = None):
@@ -52,6 +71,65 @@ def get_tasks_by_priority(db: Session, priority: str, user_id: int = None):
         query = query.filter(models.Task.owner_id == user_id)
     return query.all()
 
+# Task counters: task_counters holds one row per (owner, priority, completed)
+# and is adjusted by triggers on tasks (models.TASK_COUNTER_TRIGGERS_DDL) within
+# every write, so stats never need to count the tasks table.
+# rebuild_task_counters repairs any drift.
+def rebuild_task_counters(db: Session):
+    """Recompute task_counters from the tasks table; the caller commits
+
+    Accepts a Session or a Connection, so migrations can run it too.
+    """
+    owner_id = func.coalesce(models.Task.owner_id, 0)
+    priority = func.coalesce(models.Task.priority, "")
+    completed = func.coalesce(models.Task.completed, False)
+    db.execute(delete(models.TaskCounter))
+    db.execute(
+        insert(models.TaskCounter).from_select(
+            ["owner_id", "priority", "completed", "count"],
+            select(owner_id, priority, completed, func.count()).group_by(owner_id, priority, completed),
+        )
+    )
+
+def rebuild_search_index(db: Session):
+    """Rebuild tasks_fts from the tasks table; the caller commits
+
+    Accepts a Session or a Connection, so migrations can run it too.
+    """
+    db.execute(text("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')"))
+
+# Title matches outrank description matches in bm25
+SEARCH_COLUMN_WEIGHTS = (10.0, 1.0)
+
+def _fts_query(query: str):
+    """Quote each word so user input is never parsed as FTS5 query syntax"""
+    return " ".join(f'"{term}"' for term in re.findall(r"\w+", query))
+
+def search_tasks(db: Session, query: str, user_id: int = None, limit: int = 20,
+                 after: Tuple[float, int] = None):
+    """Tasks whose title or description contain every word of query, best first
+
+    Returns (task, score) pairs ordered by bm25 score, lowest (best) first, then
+    id. Pass the last pair's (score, id) as `after` to fetch the next page.
+    """
+    match = _fts_query(query)
+    if not match:
+        return []
+    fts = table("tasks_fts", column("rowid"))
+    fts_table = literal_column("tasks_fts")
+    matches = (
+        select(fts.c.rowid.label("task_id"), func.bm25(fts_table, *SEARCH_COLUMN_WEIGHTS).label("score"))
+        .where(fts_table.op("MATCH")(match))
+        .subquery("matches")
+    )
+    stmt = select(models.Task, matches.c.score).join(matches, matches.c.task_id == models.Task.id)
+    if user_id:
+        stmt = stmt.where(models.Task.owner_id == user_id)
+    if after is not None:
+        stmt = stmt.where(tuple_(matches.c.score, models.Task.id) > tuple_(*after))
+    stmt = stmt.order_by(matches.c.score, models.Task.id).limit(limit)
+    return [(task, score) for task, score in db.execute(stmt)]
+
 def create_task(db: Session, task: schemas.TaskCreate, user_id: int):
     db_task = models.Task(**task.dict(), owner_id=user_id)
     db.add(db_task)
@@ -59,18 +137,70 @@ def create_task(db: Session, task: schemas.TaskCreate, user_id: int):
     db.refresh(db_task)
     return db_task
 
-def update_task(db: Session, task_id: int, task_update: schemas.TaskUpdate):
-    db_task = get_task(db, task_id)
-    if not db_task:
-        return None
+def create_tasks_bulk(db: Session, tasks: List[schemas.TaskCreate], user_id: int):
+    """Insert many tasks in one statement batch and one commit
+
+    Timestamps are assigned here rather than by the column defaults so the
+    caller gets them back without re-selecting the rows.
+    """
+    now = datetime.utcnow()
+    if not tasks:
+        return [], now
     
-    update_data = task_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_task, field, value)
+    rows = [
+        {**task.model_dump(), "owner_id": user_id, "created_at": now, "updated_at": now}
+        for task in tasks
+    ]
+    stmt = insert(models.Task).returning(models.Task.id, sort_by_parameter_order=True)
+    ids = list(db.scalars(stmt, rows))
+    db.commit()
+    return ids, now
+
+def import_tasks(db: Session, tasks: List[Tuple[int, schemas.TaskCreate]]):
+    """Insert (owner_id, task) pairs for any number of owners in one transaction
+
+    Uses a plain Core executemany, since imports do not need the new ids or
+    ORM bookkeeping back. Returns the number of tasks inserted.
+    """
+    if not tasks:
+        return 0
+    now = datetime.utcnow()
+    rows = [
+        {**task.model_dump(), "owner_id": owner_id, "created_at": now, "updated_at": now}
+        for owner_id, task in tasks
+    ]
+    db.execute(insert(models.Task.__table__), rows)
+    db.commit()
+    return len(rows)
+
+def update_task(db: Session, task_id: int, task_update: schemas.TaskUpdate, expected_updated_at: datetime = None):
+    """Apply task_update and return the updated task, or None if there is no such task
+
+    With expected_updated_at the UPDATE only matches while the task still has
+    that updated_at, so a conditional update cannot overwrite a write that
+    committed after the caller's read; None is returned in that case too.
+    """
+    update_data = task_update.model_dump(exclude_unset=True)
+    if not update_data:
+        # Nothing to write, so updated_at (and the ETag) stay as they are
+        db_task = get_task(db, task_id)
+        if db_task is None or expected_updated_at not in (None, db_task.updated_at):
+            return None
+        return db_task
     
+    criteria = [models.Task.id == task_id]
+    if expected_updated_at is not None:
+        criteria.append(models.Task.updated_at == expected_updated_at)
+    # updated_at is bumped by the column's onupdate
+    result = db.execute(
+        update(models.Task).where(*criteria).values(**update_data),
+        execution_options={"synchronize_session": False}
+    )
+    if result.rowcount == 0:
+        db.rollback()
+        return None
     db.commit()
-    db.refresh(db_task)
-    return db_task
+    return get_task(db, task_id)
 
 def delete_task(db: Session, task_id: int):
     db_task = get_task(db, task_id)
@@ -81,9 +211,98 @@ def delete_task(db: Session, task_id: int):
     db.commit()
     return True
 
+def _task_filter_criteria(task_filter: schemas.TaskFilter = None):
+    criteria = []
+    if task_filter is None:
+        return criteria
+    if task_filter.owner_id is not None:
+        criteria.append(models.Task.owner_id == task_filter.owner_id)
+    if task_filter.priority is not None:
+        criteria.append(models.Task.priority == task_filter.priority)
+    if task_filter.completed is not None:
+        criteria.append(models.Task.completed == task_filter.completed)
+    return criteria
+
+def export_tasks_statement(task_filter: schemas.TaskFilter = None):
+    """Core SELECT of the schemas.Task fields of every matching task, ordered by id
+
+    Plain rows instead of ORM objects, for exports streamed with yield_per.
+    """
+    columns = [getattr(models.Task, field) for field in schemas.Task.model_fields]
+    return select(*columns).where(*_task_filter_criteria(task_filter)).order_by(models.Task.id)
+
+def stream_tasks(db: Session, task_filter: schemas.TaskFilter = None, batch_size: int = 1000):
+    """Yield matching task rows in batches from a server-side cursor
+
+    Only one batch is held in memory at a time, however many tasks match.
+    """
+    result = db.execute(export_tasks_statement(task_filter).execution_options(yield_per=batch_size))
+    yield from result.partitions()
+
+def _bulk_task_criteria(ids: List[int] = None, task_filter: schemas.TaskFilter = None):
+    """WHERE criteria for one set-based statement per id chunk, or a single filter statement"""
+    criteria = _task_filter_criteria(task_filter)
+    if ids is None and not criteria:
+        raise ValueError("Bulk operations require ids or a non-empty filter")
+    if ids is None:
+        return [criteria]
+    return [
+        criteria + [models.Task.id.in_(ids[start:start + BULK_ID_CHUNK_SIZE])]
+        for start in range(0, len(ids), BULK_ID_CHUNK_SIZE)
+    ]
+
+def bulk_update_tasks(db: Session, task_update: schemas.TaskUpdate, ids: List[int] = None,
+                      task_filter: schemas.TaskFilter = None):
+    """Apply one update to every matching task and return the affected count
+
+    updated_at is bumped by the column's onupdate, as in update_task; an
+    empty update writes nothing.
+    """
+    update_data = task_update.model_dump(exclude_unset=True)
+    chunks = _bulk_task_criteria(ids, task_filter)
+    if not update_data:
+        return 0
+    
+    affected = 0
+    for criteria in chunks:
+        stmt = update(models.Task).where(*criteria).values(**update_data)
+        affected += db.execute(stmt.execution_options(synchronize_session=False)).rowcount
+    db.commit()
+    return affected
+
+def bulk_delete_tasks(db: Session, ids: List[int] = None, task_filter: schemas.TaskFilter = None):
+    """Delete every matching task and return the affected count"""
+    affected = 0
+    for criteria in _bulk_task_criteria(ids, task_filter):
+        stmt = delete(models.Task).where(*criteria)
+        affected += db.execute(stmt.execution_options(synchronize_session=False)).rowcount
+    db.commit()
+    return affected
+
+def get_task_counts(db: Session, user_id: int = None):
+    """Total, completed and pending counts, overall and per priority, from task_counters"""
+    counter = models.TaskCounter
+    query = db.query(counter.priority, counter.completed, func.sum(counter.count))
+    if user_id:
+        query = query.filter(counter.owner_id == user_id)
+    
+    counts = schemas.TaskCounts()
+    for priority, completed, count in query.group_by(counter.priority, counter.completed):
+        if not count:
+            continue
+        for breakdown in (counts, counts.by_priority.setdefault(priority, schemas.TaskCountBreakdown())):
+            breakdown.total += count
+            if completed:
+                breakdown.completed += count
+            else:
+                breakdown.pending += count
+    return counts
+
 def get_completed_tasks_count(db: Session, user_id: int = None):
-    query = db.query(models.Task).filter(models.Task.completed == True)
+    query = db.query(func.coalesce(func.sum(models.TaskCounter.count), 0)).filter(
+        models.TaskCounter.completed == True
+    )
     if user_id:
-        query = query.filter(models.Task.owner_id == user_id)
-    return query.count()
+        query = query.filter(models.TaskCounter.owner_id == user_id)
+    return query.scalar()
 
@@ -1,12 +1,14 @@
 """
 Database configuration and session management
 """
-from sqlalchemy import create_engine
+import os
+import re
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-# SQLite database for staging
-SQLALCHEMY_DATABASE_URL = "sqlite:///./staging_tasks.db"
+# SQLite database for staging; DATABASE_URL points elsewhere, e.g. for tests
+SQLALCHEMY_DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./staging_tasks.db")
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, 
@@ -15,6 +17,56 @@ engine = create_engine(
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# SQLite engine profiles, applied as PRAGMAs on every new connection.
+# DB_PROFILE picks a preset and SQLITE_<PRAGMA> variables (e.g.
+# SQLITE_SYNCHRONOUS=FULL) override individual settings.
+SQLITE_PROFILES = {
+    "default": {},
+    "tuned": {
+        "journal_mode": "WAL",  # readers no longer block the writer
+        "synchronous": "NORMAL",  # fsync at checkpoints instead of every commit; safe with WAL
+        "mmap_size": 268435456,  # 256MB of memory-mapped reads
+        "cache_size": -65536,  # 64MB page cache (negative values are KiB)
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,  # wait up to 5s for the write lock instead of "database is locked"
+    },
+}
+SQLITE_PRAGMA_NAMES = ("journal_mode", "synchronous", "mmap_size", "cache_size", "temp_store", "busy_timeout")
+
+def get_sqlite_pragmas(environ=os.environ):
+    """Resolve the PRAGMAs for the configured profile and overrides"""
+    profile = environ.get("DB_PROFILE", "tuned")
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {profile!r}, expected one of {sorted(SQLITE_PROFILES)}")
+    
+    pragmas = dict(SQLITE_PROFILES[profile])
+    for name in SQLITE_PRAGMA_NAMES:
+        value = environ.get(f"SQLITE_{name.upper()}")
+        if value is None:
+            continue
+        # Values are interpolated into the PRAGMA statement, so only allow plain words and numbers
+        if not re.fullmatch(r"-?\w+", value):
+            raise ValueError(f"Invalid value for SQLITE_{name.upper()}: {value!r}")
+        pragmas[name] = value
+    return profile, pragmas
+
+DB_PROFILE, SQLITE_PRAGMAS = get_sqlite_pragmas()
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record, pragmas=None):
+    """Connect event hook that applies pragmas (SQLITE_PRAGMAS by default) to a new connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in (SQLITE_PRAGMAS if pragmas is None else pragmas).items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+def get_engine_profile():
+    """Engine settings reported by the health endpoint"""
+    return {"profile": DB_PROFILE, "pragmas": dict(SQLITE_PRAGMAS)}
+
+event.listen(engine, "connect", apply_sqlite_pragmas)
+
 Base = declarative_base()
 
 def get_db():
@@ -25,7 +77,9 @@ def get_db():
     finally:
         db.close()
 
-def init_db():
-    """Initialize database tables"""
-    Base.metadata.create_all(bind=engine)
+def init_db(bind=engine):
+    """Initialize database tables and apply pending migrations"""
+    import migrations
+    Base.metadata.create_all(bind=bind)
+    migrations.upgrade(bind)
 
@@ -0,0 +1,38 @@
+"""
+Strong ETags and conditional request helpers
+
+Validators are derived from what a response is built from (ids and
+updated_at of the rows, plus the query that selected them), so a matching
+If-None-Match can be answered with 304 before anything is serialized.
+"""
+import hashlib
+from typing import Iterable, Optional
+
+def compute_etag(*parts) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+def rows_etag(scope: str, rows: Iterable, *extra) -> str:
+    """ETag for a representation built from ORM rows selected by scope"""
+    return compute_etag(scope, [(row.id, getattr(row, "updated_at", None)) for row in rows], *extra)
+
+def task_etag(task) -> str:
+    return compute_etag("task", task.id, task.updated_at)
+
+def _parse_tags(header: str):
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+def if_none_match(header: Optional[str], etag: str) -> bool:
+    """True if If-None-Match matches etag (weak comparison, per RFC 9110)"""
+    if not header:
+        return False
+    for tag in _parse_tags(header):
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+def if_match(header: Optional[str], etag: str) -> bool:
+    """True if If-Match is absent or matches etag (strong comparison)"""
+    if header is None:
+        return True
+    return any(tag == "*" or tag == etag for tag in _parse_tags(header))
@@ -3,13 +3,19 @@
 Log Analytics MCP Server
 Provides tools for Claude to query and analyze application logs
 """
-import json
+import asyncio
+import os
 import sys
 from pathlib import Path
 from datetime import datetime, timedelta
 from collections import Counter
 from typing import List, Dict, Any
 
+import log_reader
+import log_rollups
+import log_scan
+import log_stats
+
 # MCP imports
 from mcp.server import Server
 from mcp.types import Tool, TextContent
@@ -19,20 +25,36 @@ LOGS_DIR = Path("/home/azureuser/staging/logs") if Path("/home/azureuser/staging
 
 app = Server("log-analytics")
 
-def read_log_file(filename: str, max_lines: int = 1000) -> List[Dict]:
-    """Read and parse JSON log file"""
-    log_file = LOGS_DIR / filename
-    if not log_file.exists():
-        return []
-    
-    logs = []
-    with open(log_file, 'r') as f:
-        for line in f.readlines()[-max_lines:]:  # Get last N lines
-            try:
-                logs.append(json.loads(line.strip()))
-            except json.JSONDecodeError:
-                continue
-    return logs
+# Per-minute rollups tailer, started in main() when LOG_ROLLUPS is set
+rollups = None
+# Process pool for parsing large windows, started in main() on multi-core hosts
+scan_executor = None
+
+def read_log_file(filename: str, max_lines: int = 1000, since_minutes: float = None) -> List[Dict]:
+    """Read and parse the newest entries of a JSON log file and its rotated backups
+
+    Reads backward from the end and stops after max_lines entries or at the
+    start of the since_minutes window, whichever comes first. Only an
+    unbounded window (max_lines=None) is streamed forward from the window
+    start, seeking through each file's time index.
+    """
+    since = datetime.utcnow() - timedelta(minutes=since_minutes) if since_minutes is not None else None
+    if max_lines is None and since is not None:
+        return log_reader.read_window(LOGS_DIR / filename, since)
+    return log_reader.read_recent(LOGS_DIR / filename, max_lines=max_lines, since=since)
+
+def endpoint_stats_since(since_minutes: float) -> Dict[str, log_stats.EndpointStats]:
+    """Per-endpoint stats for the window, from the rollups when enabled or else the raw logs"""
+    since = datetime.utcnow() - timedelta(minutes=since_minutes)
+    if rollups is None:
+        return log_scan.scan_endpoint_stats(LOGS_DIR / "app.log", since, executor=scan_executor)
+    rollups.catch_up()
+    return rollups.store.endpoint_stats(since)
+
+def format_percentiles(stats: log_stats.EndpointStats) -> str:
+    return ", ".join(
+        f"p{p} {value:.2f}ms" for p, value in stats.percentiles().items() if value is not None
+    )
 
 def filter_logs(logs: List[Dict], filters: Dict[str, Any]) -> List[Dict]:
     """Filter logs based on criteria"""
@@ -117,15 +139,26 @@ async def list_tools() -> List[Tool]:
         ),
         Tool(
             name="get_slow_requests",
-            description="Find slow API requests above a duration threshold",
+            description="Find slow API requests above a duration threshold, or rank endpoints by p99 latency",
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "mode": {
+                        "type": "string",
+                        "enum": ["requests", "endpoints"],
+                        "description": "'requests' lists individual slow requests; 'endpoints' ranks endpoints by p99 latency",
+                        "default": "requests"
+                    },
                     "threshold_ms": {
                         "type": "number",
-                        "description": "Duration threshold in milliseconds",
+                        "description": "Duration threshold in milliseconds (applied to p99 in endpoints mode)",
                         "default": 1000
                     },
+                    "since_minutes": {
+                        "type": "number",
+                        "description": "Window for endpoints mode, in minutes",
+                        "default": 60
+                    },
                     "limit": {
                         "type": "number",
                         "description": "Maximum number of results",
@@ -136,7 +169,7 @@ async def list_tools() -> List[Tool]:
         ),
         Tool(
             name="get_endpoint_stats",
-            description="Get statistics for API endpoints (request count, avg duration, error rate)",
+            description="Get statistics for API endpoints (request count, latency percentiles, error rate)",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -152,14 +185,22 @@ async def list_tools() -> List[Tool]:
 
 @app.call_tool()
 async def call_tool(name: str, arguments: Dict) -> List[TextContent]:
-    """Handle tool calls"""
+    """Handle tool calls
+
+    Reading and parsing logs blocks, so each call runs in a worker thread and
+    concurrent calls do not hold up the event loop.
+    """
+    return await asyncio.to_thread(handle_tool, name, arguments)
+
+def handle_tool(name: str, arguments: Dict) -> List[TextContent]:
+    """Run one tool call to completion"""
     
     if name == "query_logs":
         log_type = arguments["log_type"]
         filename = "errors.log" if log_type == "errors" else "app.log"
         limit = arguments.get("limit", 50)
         
-        logs = read_log_file(filename, max_lines=1000)
+        logs = read_log_file(filename, max_lines=1000, since_minutes=arguments.get("since_minutes"))
         
         # Apply filters
         filters = {k: v for k, v in arguments.items() if k not in ["log_type", "limit"]}
@@ -184,19 +225,31 @@ async def call_tool(name: str, arguments: Dict) -> List[TextContent]:
     elif name == "analyze_errors":
         since_minutes = arguments.get("since_minutes", 60)
         
-        logs = read_log_file("errors.log", max_lines=1000)
-        logs = filter_logs(logs, {"since_minutes": since_minutes})
+        if rollups is not None:
+            rollups.catch_up()
+            modules = Counter()
+            endpoints = Counter()
+            for module, endpoint, count in rollups.store.error_counts(
+                datetime.utcnow() - timedelta(minutes=since_minutes)
+            ):
+                modules[module] += count
+                endpoints[endpoint] += count
+            total = sum(modules.values())
+            logs = read_log_file("errors.log", max_lines=5, since_minutes=since_minutes)
+        else:
+            logs = read_log_file("errors.log", max_lines=1000, since_minutes=since_minutes)
+            logs = filter_logs(logs, {"since_minutes": since_minutes})
+            # Count by module
+            modules = Counter(log.get("module", "unknown") for log in logs)
+            # Count by endpoint
+            endpoints = Counter(log.get("endpoint", "N/A") for log in logs)
+            total = len(logs)
         
-        if not logs:
+        if not total:
             return [TextContent(type="text", text="No errors found in the specified time range.")]
         
-        # Count by module
-        modules = Counter(log.get("module", "unknown") for log in logs)
-        # Count by endpoint
-        endpoints = Counter(log.get("endpoint", "N/A") for log in logs)
-        
         result = f"📊 Error Analysis (last {since_minutes} minutes)\n\n"
-        result += f"Total Errors: {len(logs)}\n\n"
+        result += f"Total Errors: {total}\n\n"
         
         result += "Top Modules with Errors:\n"
         for module, count in modules.most_common(5):
@@ -216,6 +269,26 @@ async def call_tool(name: str, arguments: Dict) -> List[TextContent]:
         threshold_ms = arguments.get("threshold_ms", 1000)
         limit = arguments.get("limit", 20)
         
+        if arguments.get("mode") == "endpoints":
+            since_minutes = arguments.get("since_minutes", 60)
+            stats = endpoint_stats_since(since_minutes)
+            ranked = sorted(
+                ((endpoint, data, data.durations.quantile(0.99)) for endpoint, data in stats.items()),
+                key=lambda x: x[2] or 0, reverse=True
+            )
+            ranked = [item for item in ranked if item[2] is not None and item[2] >= threshold_ms][:limit]
+            
+            if not ranked:
+                return [TextContent(type="text", text=f"No endpoints with p99 above {threshold_ms}ms found.")]
+            
+            result = f"🐌 Slowest Endpoints by p99 (last {since_minutes} minutes, p99 >{threshold_ms}ms):\n\n"
+            for endpoint, data, p99 in ranked:
+                result += f"• {endpoint} - p99 {p99:.2f}ms\n"
+                result += f"  Requests (estimated from samples): {data.count}\n"
+                result += f"  Latency: {format_percentiles(data)}\n\n"
+            
+            return [TextContent(type="text", text=result)]
+        
         logs = read_log_file("app.log", max_lines=1000)
         
         # Filter for slow requests
@@ -236,46 +309,22 @@ async def call_tool(name: str, arguments: Dict) -> List[TextContent]:
     elif name == "get_endpoint_stats":
         since_minutes = arguments.get("since_minutes", 60)
         
-        logs = read_log_file("app.log", max_lines=2000)
-        logs = filter_logs(logs, {"since_minutes": since_minutes})
-        
-        # Group by endpoint
-        endpoint_data = {}
-        for log in logs:
-            endpoint = log.get("endpoint", "unknown")
-            if endpoint not in endpoint_data:
-                endpoint_data[endpoint] = {
-                    "count": 0,
-                    "total_duration": 0,
-                    "errors": 0,
-                    "durations": []
-                }
-            
-            endpoint_data[endpoint]["count"] += 1
-            
-            if "duration_ms" in log:
-                duration = log["duration_ms"]
-                endpoint_data[endpoint]["total_duration"] += duration
-                endpoint_data[endpoint]["durations"].append(duration)
-            
-            if log.get("level") in ["ERROR", "CRITICAL"]:
-                endpoint_data[endpoint]["errors"] += 1
+        # Sketches keep memory fixed however long the window is
+        stats = endpoint_stats_since(since_minutes)
         
         result = f"📈 Endpoint Statistics (last {since_minutes} minutes):\n\n"
         
         # Sort by request count
-        sorted_endpoints = sorted(endpoint_data.items(), key=lambda x: x[1]["count"], reverse=True)
+        sorted_endpoints = sorted(stats.items(), key=lambda x: x[1].count, reverse=True)
         
         for endpoint, data in sorted_endpoints[:10]:
-            avg_duration = data["total_duration"] / data["count"] if data["count"] > 0 else 0
-            error_rate = (data["errors"] / data["count"] * 100) if data["count"] > 0 else 0
-            
             result += f"• {endpoint}\n"
-            result += f"  Requests: {data['count']}\n"
-            if data["durations"]:
-                result += f"  Avg Duration: {avg_duration:.2f}ms\n"
-                result += f"  Max Duration: {max(data['durations']):.2f}ms\n"
-            result += f"  Error Rate: {error_rate:.1f}%\n\n"
+            result += f"  Requests (estimated from samples): {data.count}\n"
+            if data.durations.count:
+                result += f"  Avg Duration: {data.durations.sum / data.durations.count:.2f}ms\n"
+                result += f"  Latency: {format_percentiles(data)}\n"
+                result += f"  Max Duration: {data.durations.max:.2f}ms\n"
+            result += f"  Error Rate: {data.error_rate:.1f}%\n\n"
         
         return [TextContent(type="text", text=result)]
     
@@ -284,16 +333,27 @@ async def call_tool(name: str, arguments: Dict) -> List[TextContent]:
 
 async def main():
     """Run the MCP server"""
+    global rollups, scan_executor
     from mcp.server.stdio import stdio_server
     
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(
-            read_stream,
-            write_stream,
-            app.create_initialization_options()
-        )
+    scan_executor = log_scan.make_executor()
+    if os.environ.get("LOG_ROLLUPS"):
+        rollups = log_rollups.RollupTailer(LOGS_DIR, db_path=os.environ.get("LOG_ROLLUP_DB"))
+        rollups.start()
+    
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await app.run(
+                read_stream,
+                write_stream,
+                app.create_initialization_options()
+            )
+    finally:
+        if rollups is not None:
+            rollups.stop()
+        if scan_executor is not None:
+            scan_executor.shutdown()
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
 
@@ -0,0 +1,274 @@
+"""
+Log file reading for the log analytics server
+
+Kept free of MCP imports so the reading logic can be used and tested on its
+own. Log files are JSON lines in time order, as written by logging_config,
+which rotates app.log into app.log.1 .. app.log.N (newest first). Backups may
+also have been compressed to app.log.N.gz; readers treat the whole set as
+one stream.
+"""
+import bisect
+import glob
+import gzip
+import json
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+# Bytes read per backward seek
+BLOCK_SIZE = 64 * 1024
+# Bytes between time index entries
+INDEX_INTERVAL = 64 * 1024
+
+def iter_lines_reverse(path, block_size: int = BLOCK_SIZE) -> Iterator[bytes]:
+    """Yield the lines of a file from last to first, reading fixed-size blocks backward from the end"""
+    with open(path, "rb") as f:
+        position = f.seek(0, os.SEEK_END)
+        partial = b""
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            block = f.read(read_size) + partial
+            lines = block.split(b"\n")
+            # The first piece may continue in the previous block
+            partial = lines.pop(0)
+            for line in reversed(lines):
+                if line:
+                    yield line
+        if partial:
+            yield partial
+
+def parse_line(line: bytes) -> Optional[Dict]:
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return None
+    return entry if isinstance(entry, dict) else None
+
+def entry_time(entry: Dict) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(entry["timestamp"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def log_files(path) -> List[Path]:
+    """A log file and its rotated backups, oldest first: name.N[.gz], ..., name.1[.gz], name"""
+    path = Path(path)
+    backups = []
+    for candidate in path.parent.glob(glob.escape(path.name) + ".*"):
+        suffix = candidate.name[len(path.name) + 1:]
+        if suffix.endswith(".gz"):
+            suffix = suffix[:-len(".gz")]
+        if suffix.isdigit():
+            backups.append((int(suffix), candidate))
+    files = [candidate for _, candidate in sorted(backups, reverse=True)]
+    if path.exists():
+        files.append(path)
+    return files
+
+def _is_gzip(path: Path) -> bool:
+    return path.name.endswith(".gz")
+
+def open_log(path: Path):
+    """Open a log file or gzip backup for reading bytes"""
+    return gzip.open(path, "rb") if _is_gzip(path) else open(path, "rb")
+
+def _lines_reverse(path: Path) -> Iterator[bytes]:
+    if not _is_gzip(path):
+        return iter_lines_reverse(path)
+    # gzip cannot seek backward cheaply; a backup is at most one rotation's worth
+    with gzip.open(path, "rb") as f:
+        return reversed(f.read().splitlines())
+
+def _read_back(path: Path, entries: List[Dict], max_lines: Optional[int], since: Optional[datetime]) -> bool:
+    # Appends newest-first entries of one file; True once the window is complete
+    try:
+        for line in _lines_reverse(path):
+            entry = parse_line(line)
+            if entry is None:
+                continue
+            if since is not None:
+                timestamp = entry_time(entry)
+                if timestamp is not None and timestamp <= since:
+                    return True
+            entries.append(entry)
+            if max_lines is not None and len(entries) >= max_lines:
+                return True
+    except FileNotFoundError:
+        # Rotated away since the listing; its entries are under an older name
+        pass
+    return False
+
+def read_recent(path, max_lines: int = None, since: datetime = None) -> List[Dict]:
+    """The newest entries of a log file and its backups, oldest first
+
+    Reads backward from the end and stops after max_lines parsed entries or at
+    the first entry older than since, so the cost depends on the window rather
+    than the size of the files.
+    """
+    entries = []
+    for file in reversed(log_files(path)):
+        if _read_back(file, entries, max_lines, since):
+            break
+    entries.reverse()
+    return entries
+
+def _line_time(line: bytes) -> Optional[datetime]:
+    entry = parse_line(line)
+    return entry_time(entry) if entry is not None else None
+
+class TimeIndex:
+    """Sparse timestamp -> byte offset index of a log file, kept in a sidecar file
+
+    One entry per `interval` bytes records the timestamp and offset of the
+    first line at or after that point. The sidecar (.<name>.idx next to the
+    log) remembers the file's inode and how far it has been indexed, so later
+    refreshes only scan bytes appended since. A new inode (the file was
+    rotated and recreated) or a smaller size (truncated) starts a new index.
+    """
+
+    def __init__(self, path, interval: int = INDEX_INTERVAL):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(f".{self.path.name}.idx")
+        self.interval = interval
+        self._reset(None)
+
+    def _reset(self, inode: Optional[int]):
+        self.inode = inode
+        self.size = 0
+        self.timestamps: List[datetime] = []
+        self.offsets: List[int] = []
+
+    def _load(self):
+        try:
+            with open(self.index_path) as f:
+                data = json.load(f)
+            self.inode = data["inode"]
+            self.size = data["size"]
+            self.timestamps = [datetime.fromisoformat(timestamp) for timestamp in data["timestamps"]]
+            self.offsets = data["offsets"]
+        except (OSError, KeyError, TypeError, ValueError):
+            self._reset(None)
+
+    def _save(self):
+        data = {
+            "inode": self.inode,
+            "size": self.size,
+            "timestamps": [timestamp.isoformat() for timestamp in self.timestamps],
+            "offsets": self.offsets,
+        }
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.index_path.parent, prefix=".idx_")
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            # Read-only log directory: the index still serves this process
+            pass
+
+    def refresh(self) -> "TimeIndex":
+        """Bring the index up to date with the file, scanning only new bytes"""
+        stat = os.stat(self.path)
+        if self.inode is None:
+            self._load()
+        if self.inode != stat.st_ino or stat.st_size < self.size:
+            self._reset(stat.st_ino)
+        if stat.st_size > self.size:
+            self._extend()
+            self._save()
+        return self
+
+    def _extend(self):
+        next_mark = self.offsets[-1] + self.interval if self.offsets else 0
+        with open(self.path, "rb") as f:
+            f.seek(self.size)
+            offset = self.size
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Still being written; index it on a later refresh
+                    break
+                if offset >= next_mark:
+                    timestamp = _line_time(line)
+                    if timestamp is not None:
+                        self.timestamps.append(timestamp)
+                        self.offsets.append(offset)
+                        next_mark = offset + self.interval
+                offset += len(line)
+        self.size = offset
+
+    def offset_for(self, since: datetime) -> int:
+        """Byte offset from which every entry newer than since can be read"""
+        i = bisect.bisect_left(self.timestamps, since) - 1
+        return self.offsets[i] if i >= 0 else 0
+
+def _first_time(path: Path) -> Optional[datetime]:
+    try:
+        with open_log(path) as f:
+            for line in f:
+                timestamp = _line_time(line)
+                if timestamp is not None:
+                    return timestamp
+    except (OSError, EOFError):
+        pass
+    return None
+
+def _iter_file(path: Path, since: Optional[datetime], until: Optional[datetime]) -> Iterator[Dict]:
+    try:
+        start = 0
+        if since is not None and not _is_gzip(path):
+            start = TimeIndex(path).refresh().offset_for(since)
+        f = open_log(path)
+    except FileNotFoundError:
+        return
+    with f:
+        f.seek(start)
+        for line in f:
+            entry = parse_line(line)
+            if entry is None:
+                continue
+            timestamp = entry_time(entry)
+            if timestamp is not None:
+                if since is not None and timestamp <= since:
+                    continue
+                if until is not None and timestamp > until:
+                    return
+            yield entry
+
+def window_files(path, since: datetime = None, until: datetime = None) -> List[Path]:
+    """The files of a log set, oldest first, that may hold entries in (since, until]
+
+    Each file covers the time from its first entry to the first entry of the
+    next newer file, so files entirely outside the window are ruled out after
+    reading one line of each.
+    """
+    files = log_files(path)
+    starts = [_first_time(file) for file in files]
+    selected = []
+    for i, file in enumerate(files):
+        if until is not None and starts[i] is not None and starts[i] > until:
+            break
+        next_start = next((start for start in starts[i + 1:] if start is not None), None)
+        if since is not None and next_start is not None and next_start <= since:
+            continue
+        selected.append(file)
+    return selected
+
+def iter_entries(path, since: datetime = None, until: datetime = None) -> Iterator[Dict]:
+    """Lazily yield entries in (since, until] from a log file and its backups, oldest first
+
+    Files outside the window are skipped (see window_files). Plain files seek
+    through their TimeIndex to the start of the window; gzip backups are
+    decompressed as a stream. Memory use is independent of the window length.
+    """
+    for file in window_files(path, since, until):
+        yield from _iter_file(file, since, until)
+
+def read_window(path, since: datetime) -> List[Dict]:
+    """Every entry newer than since across a log file and its backups
+
+    For bounded reads of the newest entries, read_recent stops early instead.
+    """
+    return list(iter_entries(path, since=since))
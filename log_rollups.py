@@ -0,0 +1,254 @@
+"""
+Per-minute rollups of request and error logs for the log analytics server
+
+RollupTailer follows app.log and errors.log, remembering the inode and byte
+offset reached in each, and folds every new record into SQLite rows: one per
+(minute, endpoint, method, status) with the estimated request count, errors,
+response bytes and a duration QuantileSketch, and one per (minute, module,
+endpoint) counting errors. A report over a day then reads at most a few
+thousand rows instead of re-parsing every log line. Windows are rounded down
+to the start of a minute.
+"""
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import log_reader
+from log_stats import EndpointStats, QuantileSketch
+
+ROLLUP_INTERVAL_SECONDS = float(os.environ.get("LOG_ROLLUP_INTERVAL", 5.0))
+# Bytes of log folded into rollups per transaction
+READ_CHUNK = 4 * 1024 * 1024
+# Offset recorded for a gzip backup read to the end; backups never change, so it is not reopened
+FINISHED = -1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS request_rollups (
+    minute TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    method TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    count REAL NOT NULL,
+    errors REAL NOT NULL,
+    bytes REAL NOT NULL,
+    durations TEXT NOT NULL,
+    PRIMARY KEY (minute, endpoint, method, status)
+);
+CREATE TABLE IF NOT EXISTS error_rollups (
+    minute TEXT NOT NULL,
+    module TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (minute, module, endpoint)
+);
+CREATE TABLE IF NOT EXISTS tail_positions (
+    name TEXT PRIMARY KEY,
+    inode INTEGER NOT NULL,
+    offset INTEGER NOT NULL
+);
+"""
+
+def minute_of(timestamp: datetime) -> str:
+    return timestamp.isoformat(timespec="minutes")
+
+class RollupStore:
+    """SQLite tables of per-minute rollups and how far each log has been read"""
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def position(self, name: str) -> Tuple[Optional[int], int]:
+        """(inode, offset) reached in the named log, or (None, 0) before the first read"""
+        with self._lock:
+            row = self._conn.execute("SELECT inode, offset FROM tail_positions WHERE name = ?", (name,)).fetchone()
+        return (row[0], row[1]) if row else (None, 0)
+
+    def apply(self, name: str, inode: int, offset: int, requests: Dict[tuple, EndpointStats],
+              errors: Dict[tuple, int]):
+        """Merge one chunk's rollups and advance the log position in a single transaction"""
+        with self._lock, self._conn:
+            for key, stats in requests.items():
+                row = self._conn.execute(
+                    "SELECT count, errors, bytes, durations FROM request_rollups "
+                    "WHERE minute = ? AND endpoint = ? AND method = ? AND status = ?",
+                    key
+                ).fetchone()
+                if row is not None:
+                    stats.merge(_row_stats(row))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO request_rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    key + (stats.count, stats.errors, stats.bytes, json.dumps(stats.durations.to_dict()))
+                )
+            self._conn.executemany(
+                "INSERT INTO error_rollups VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (minute, module, endpoint) DO UPDATE SET count = count + excluded.count",
+                [key + (count,) for key, count in errors.items()]
+            )
+            self._conn.execute("INSERT OR REPLACE INTO tail_positions VALUES (?, ?, ?)", (name, inode, offset))
+
+    def endpoint_stats(self, since: datetime) -> Dict[str, EndpointStats]:
+        """Rollups from the minute containing since onward, merged per endpoint"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT endpoint, count, errors, bytes, durations FROM request_rollups WHERE minute >= ?",
+                (minute_of(since),)
+            ).fetchall()
+        stats: Dict[str, EndpointStats] = {}
+        for endpoint, *row in rows:
+            if endpoint not in stats:
+                stats[endpoint] = EndpointStats()
+            stats[endpoint].merge(_row_stats(row))
+        return stats
+
+    def error_counts(self, since: datetime) -> List[Tuple[str, str, int]]:
+        """(module, endpoint, errors) from the minute containing since onward"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT module, endpoint, SUM(count) FROM error_rollups WHERE minute >= ? "
+                "GROUP BY module, endpoint",
+                (minute_of(since),)
+            ).fetchall()
+
+def _row_stats(row) -> EndpointStats:
+    stats = EndpointStats()
+    stats.count, stats.errors, stats.bytes = row[0], row[1], row[2]
+    stats.durations = QuantileSketch.from_dict(json.loads(row[3]))
+    return stats
+
+def _inode(path: Path) -> Optional[int]:
+    try:
+        return os.stat(path).st_ino
+    except FileNotFoundError:
+        return None
+
+class LogTailer:
+    """Follows one log file across rotations, folding complete new lines into the store
+
+    kind is "requests" for app.log (request completion records) or "errors"
+    for errors.log. The first poll backfills the rotated backups as well.
+    """
+
+    def __init__(self, store: RollupStore, path, kind: str):
+        self.store = store
+        self.path = Path(path)
+        self.kind = kind
+
+    def poll(self):
+        position = self.store.position(self.path.name)
+        inode, offset = position
+        files = log_reader.log_files(self.path)
+        if not files:
+            return
+        inodes = [_inode(file) for file in files]
+        if inode is None:
+            start, offset = 0, 0
+        elif inode in inodes:
+            # The file last read, possibly rotated to a backup name since
+            start = inodes.index(inode)
+            if offset == FINISHED:
+                start, offset = start + 1, 0
+            elif not files[start].name.endswith(".gz") and os.path.getsize(files[start]) < offset:
+                # Truncated in place; a gzip backup's size is compressed, so not comparable
+                offset = 0
+        else:
+            # Rotated out of reach (or compressed); carry on with the current file
+            start, offset = len(files) - 1, 0
+        for i in range(start, len(files)):
+            position = self._consume(files[i], inodes[i], offset if i == start else 0, position)
+
+    def _consume(self, path: Path, inode: Optional[int], offset: int, position: Tuple[Optional[int], int]):
+        """Fold complete lines from offset onward and return the position recorded last"""
+        if inode is None:
+            return position
+        try:
+            f = log_reader.open_log(path)
+        except FileNotFoundError:
+            return position
+        with f:
+            f.seek(offset)
+            while True:
+                lines = f.readlines(READ_CHUNK)
+                if lines and not lines[-1].endswith(b"\n"):
+                    # Still being written; read it whole on a later poll
+                    lines.pop()
+                if not lines:
+                    break
+                offset += sum(len(line) for line in lines)
+                requests, errors = self._aggregate(lines)
+                self.store.apply(self.path.name, inode, offset, requests, errors)
+                position = (inode, offset)
+        # Record reaching the end even without new lines, so the next poll
+        # resumes from this file rather than an older one
+        if path.name.endswith(".gz"):
+            offset = FINISHED
+        if (inode, offset) != position:
+            self.store.apply(self.path.name, inode, offset, {}, {})
+            position = (inode, offset)
+        return position
+
+    def _aggregate(self, lines: List[bytes]) -> Tuple[Dict[tuple, EndpointStats], Dict[tuple, int]]:
+        requests: Dict[tuple, EndpointStats] = {}
+        errors: Dict[tuple, int] = {}
+        for line in lines:
+            entry = log_reader.parse_line(line)
+            if entry is None:
+                continue
+            timestamp = log_reader.entry_time(entry)
+            if timestamp is None:
+                continue
+            minute = minute_of(timestamp)
+            if self.kind == "errors":
+                key = (minute, entry.get("module", "unknown"), entry.get("endpoint", "N/A"))
+                errors[key] = errors.get(key, 0) + 1
+            elif "endpoint" in entry and "status_code" in entry:
+                key = (minute, entry.get("route") or entry["endpoint"], entry.get("method", ""), entry["status_code"])
+                if key not in requests:
+                    requests[key] = EndpointStats()
+                requests[key].add(entry)
+        return requests, errors
+
+class RollupTailer(threading.Thread):
+    """Background thread keeping the rollups of app.log and errors.log current"""
+
+    def __init__(self, logs_dir, db_path=None, interval: float = ROLLUP_INTERVAL_SECONDS):
+        super().__init__(name="log-rollup-tailer", daemon=True)
+        logs_dir = Path(logs_dir)
+        self.store = RollupStore(db_path or logs_dir / "rollups.db")
+        self.interval = interval
+        self.tailers = [
+            LogTailer(self.store, logs_dir / "app.log", "requests"),
+            LogTailer(self.store, logs_dir / "errors.log", "errors"),
+        ]
+        self._poll_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def catch_up(self):
+        """Fold in everything logged since the last poll; queries call this to see fresh data"""
+        with self._poll_lock:
+            for tailer in self.tailers:
+                tailer.poll()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.catch_up()
+            except (OSError, sqlite3.Error):
+                # Try again next interval rather than lose the thread
+                continue
+
+    def stop(self):
+        self._stopped.set()
+        if self.is_alive():
+            self.join()
+        self.store.close()
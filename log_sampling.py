@@ -0,0 +1,81 @@
+"""
+Sampling of per-request log records for high-throughput traffic
+
+Errors (status >= 400) and requests slower than the threshold are always
+logged. Fast successful requests are sampled per route template, either at
+a fixed rate, under a per-route budget of records per second, or both.
+Every kept record carries a sample_weight: the number of fast requests it
+stands for since the previous kept record on that route, so summing weights
+estimates the true request count.
+"""
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+class RequestLogSampler:
+    """Decides which request records to keep and how many requests each represents"""
+
+    def __init__(self, rate: float = 1.0, budget_per_second: float = 0.0, slow_ms: float = 500.0,
+                 clock=time.monotonic, rng: random.Random = None):
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError("Sample rate must be between 0 and 1")
+        self.rate = rate
+        self.budget_per_second = budget_per_second
+        self.slow_ms = slow_ms
+        self._clock = clock
+        self._random = (rng or random.Random()).random
+        self._lock = threading.Lock()
+        # Per route: fast requests skipped since the last kept one, and budget tokens
+        self._skipped: Dict[str, int] = {}
+        self._buckets: Dict[str, list] = {}
+        self.kept = 0
+        self.skipped = 0
+
+    def sample(self, route: str, status_code: int, duration_ms: float) -> Optional[int]:
+        """sample_weight for a kept record, or None if the record should be skipped"""
+        if status_code >= 400 or duration_ms >= self.slow_ms:
+            with self._lock:
+                self.kept += 1
+            return 1
+        with self._lock:
+            if (self.rate >= 1.0 or self._random() < self.rate) and self._take_token(route):
+                weight = self._skipped.pop(route, 0) + 1
+                self.kept += 1
+                return weight
+            self._skipped[route] = self._skipped.get(route, 0) + 1
+            self.skipped += 1
+            return None
+
+    def _take_token(self, route: str) -> bool:
+        # Caller holds the lock; a budget of 0 means unlimited
+        if self.budget_per_second <= 0:
+            return True
+        now = self._clock()
+        bucket = self._buckets.get(route)
+        if bucket is None:
+            bucket = self._buckets[route] = [self.budget_per_second, now]
+        tokens = min(self.budget_per_second, bucket[0] + (now - bucket[1]) * self.budget_per_second)
+        bucket[1] = now
+        if tokens < 1.0:
+            bucket[0] = tokens
+            return False
+        bucket[0] = tokens - 1.0
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "budget_per_second": self.budget_per_second,
+                "slow_ms": self.slow_ms,
+                "kept": self.kept,
+                "skipped": self.skipped,
+            }
+
+request_sampler = RequestLogSampler(
+    rate=float(os.environ.get("LOG_SAMPLE_RATE", 1.0)),
+    budget_per_second=float(os.environ.get("LOG_SAMPLE_BUDGET", 0.0)),
+    slow_ms=float(os.environ.get("LOG_SLOW_REQUEST_MS", 500.0)),
+)
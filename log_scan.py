@@ -0,0 +1,109 @@
+"""
+Parallel scans of large log windows for the log analytics server
+
+Parsing JSON lines is CPU-bound, so a window worth more than
+PARALLEL_MIN_BYTES is split into newline-aligned byte ranges of about
+CHUNK_BYTES, each range is parsed and aggregated into per-endpoint
+EndpointStats in a worker process, and the partial results are merged
+(the quantile sketches merge exactly). Plain files are split from the
+TimeIndex offset of the window start; gzip backups cannot be split and are
+one range each. Smaller windows are scanned in the calling process.
+"""
+import math
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import log_reader
+from log_stats import EndpointStats, endpoint_stats
+from process_pool import process_pool
+
+CHUNK_BYTES = 16 * 1024 * 1024
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+SCAN_WORKERS = int(os.environ.get("LOG_SCAN_WORKERS", 0)) or os.cpu_count() or 1
+
+# (path, start offset, end offset or None for the whole file)
+Range = Tuple[str, int, Optional[int]]
+
+def byte_ranges(path, start: int = 0, chunk_bytes: int = CHUNK_BYTES) -> List[Range]:
+    """Split path from start to its current end into ranges that begin and end on line boundaries"""
+    end = os.path.getsize(path)
+    count = max(1, math.ceil((end - start) / chunk_bytes))
+    bounds = [start]
+    with open(path, "rb") as f:
+        for i in range(1, count):
+            # Back up one byte so a boundary already at a line start stays put
+            f.seek(start + (end - start) * i // count - 1)
+            f.readline()
+            bound = min(f.tell(), end)
+            if bound > bounds[-1]:
+                bounds.append(bound)
+    bounds.append(end)
+    return [(str(path), bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1) if bounds[i + 1] > bounds[i]]
+
+def _range_entries(range_: Range, since: Optional[datetime], until: Optional[datetime]) -> Iterator[Dict]:
+    path, start, end = range_
+    with log_reader.open_log(Path(path)) as f:
+        f.seek(start)
+        position = start
+        for line in f:
+            if end is not None and position >= end:
+                break
+            position += len(line)
+            entry = log_reader.parse_line(line)
+            if entry is None:
+                continue
+            timestamp = log_reader.entry_time(entry)
+            if timestamp is not None:
+                if since is not None and timestamp <= since:
+                    continue
+                if until is not None and timestamp > until:
+                    break
+            yield entry
+
+def scan_range(range_: Range, since: Optional[datetime], until: Optional[datetime]) -> Dict[str, EndpointStats]:
+    """Per-endpoint stats of the entries in one range; runs in a worker process"""
+    return endpoint_stats(_range_entries(range_, since, until))
+
+def window_ranges(path, since: datetime = None, until: datetime = None,
+                  chunk_bytes: int = CHUNK_BYTES) -> List[Range]:
+    """Newline-aligned ranges covering the window across a log file and its backups"""
+    ranges = []
+    for file in log_reader.window_files(path, since, until):
+        try:
+            if file.name.endswith(".gz"):
+                ranges.append((str(file), 0, None))
+                continue
+            start = log_reader.TimeIndex(file).refresh().offset_for(since) if since is not None else 0
+            ranges.extend(byte_ranges(file, start, chunk_bytes))
+        except FileNotFoundError:
+            # Rotated away since the listing
+            continue
+    return ranges
+
+def _range_size(range_: Range) -> int:
+    path, start, end = range_
+    return (end if end is not None else os.path.getsize(path)) - start
+
+def scan_endpoint_stats(path, since: datetime = None, until: datetime = None, executor: Executor = None,
+                        chunk_bytes: int = CHUNK_BYTES) -> Dict[str, EndpointStats]:
+    """Per-endpoint stats for (since, until], parsed across executor's processes for large windows"""
+    ranges = window_ranges(path, since, until, chunk_bytes)
+    if executor is None or len(ranges) < 2 or sum(map(_range_size, ranges)) < PARALLEL_MIN_BYTES:
+        partials = [scan_range(range_, since, until) for range_ in ranges]
+    else:
+        partials = executor.map(scan_range, ranges, [since] * len(ranges), [until] * len(ranges))
+    merged: Dict[str, EndpointStats] = {}
+    for partial in partials:
+        for endpoint, stats in partial.items():
+            if endpoint in merged:
+                merged[endpoint].merge(stats)
+            else:
+                merged[endpoint] = stats
+    return merged
+
+def make_executor() -> Optional[ProcessPoolExecutor]:
+    """A pool of SCAN_WORKERS processes, or None on a single core where it would only add overhead"""
+    return process_pool(SCAN_WORKERS) if SCAN_WORKERS > 1 else None
@@ -0,0 +1,155 @@
+"""
+Per-endpoint request statistics for the log analytics server
+
+Latency percentiles come from a DDSketch-style quantile sketch: durations
+are counted in logarithmic buckets whose width is a fixed fraction of their
+value, so any quantile is accurate to within RELATIVE_ACCURACY of the true
+value, memory is bounded by MAX_BUCKETS however many requests are added,
+and sketches from different windows, files or processes merge by adding
+bucket counts.
+"""
+import math
+from typing import Dict, Iterable, Optional
+
+RELATIVE_ACCURACY = 0.01
+MAX_BUCKETS = 2048
+# Durations at or below this many milliseconds are counted as zero
+MIN_VALUE = 1e-3
+
+PERCENTILES = (50, 90, 95, 99)
+
+class QuantileSketch:
+    """Mergeable streaming quantiles with relative error guarantees"""
+
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY, max_buckets: int = MAX_BUCKETS):
+        if not 0.0 < relative_accuracy < 1.0:
+            raise ValueError("Relative accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: Dict[int, float] = {}
+        self.zero_count = 0.0
+        self.count = 0.0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, weight: float = 1):
+        """Count value weight times, e.g. a sampled log record standing for several requests"""
+        if value > MIN_VALUE:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[key] = self.buckets.get(key, 0) + weight
+            if len(self.buckets) > self.max_buckets:
+                self._collapse()
+        else:
+            self.zero_count += weight
+        self.count += weight
+        self.sum += value * weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "QuantileSketch"):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _collapse(self):
+        # Fold the lowest buckets together; only the fastest quantiles lose accuracy
+        keys = sorted(self.buckets)
+        excess = keys[:len(keys) - self.max_buckets + 1]
+        self.buckets[excess[-1]] += sum(self.buckets.pop(key) for key in excess[:-1])
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated value at quantile q (0..1), or None for an empty sketch"""
+        if self.count <= 0:
+            return None
+        rank = q * (self.count - 1)
+        cumulative = self.zero_count
+        if cumulative > rank:
+            return max(self.min, 0.0)
+        for key in sorted(self.buckets):
+            cumulative += self.buckets[key]
+            if cumulative > rank:
+                value = 2 * self._gamma ** key / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "buckets": [[key, count] for key, count in self.buckets.items()],
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QuantileSketch":
+        sketch = cls(relative_accuracy=data["relative_accuracy"])
+        sketch.buckets = {int(key): count for key, count in data["buckets"]}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        if data["min"] is not None:
+            sketch.min = data["min"]
+            sketch.max = data["max"]
+        return sketch
+
+def is_error(entry: Dict) -> bool:
+    return entry.get("level") in ("ERROR", "CRITICAL") or (entry.get("status_code") or 0) >= 500
+
+class EndpointStats:
+    """Estimated request count, errors, response bytes and latency sketch for one route"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.bytes = 0
+        self.durations = QuantileSketch()
+
+    def add(self, entry: Dict):
+        # Each sampled record stands for sample_weight requests
+        weight = entry.get("sample_weight", 1)
+        self.count += weight
+        if is_error(entry):
+            self.errors += weight
+        if entry.get("response_bytes"):
+            self.bytes += entry["response_bytes"] * weight
+        if "duration_ms" in entry:
+            self.durations.add(entry["duration_ms"], weight)
+
+    def merge(self, other: "EndpointStats"):
+        self.count += other.count
+        self.errors += other.errors
+        self.bytes += other.bytes
+        self.durations.merge(other.durations)
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.count * 100 if self.count else 0.0
+
+    def percentiles(self) -> Dict[int, Optional[float]]:
+        return {p: self.durations.quantile(p / 100) for p in PERCENTILES}
+
+def endpoint_stats(entries: Iterable[Dict]) -> Dict[str, EndpointStats]:
+    """Request records grouped by route template (or path, for older records)"""
+    stats: Dict[str, EndpointStats] = {}
+    for entry in entries:
+        if "endpoint" not in entry:
+            continue
+        endpoint = entry.get("route") or entry["endpoint"]
+        if endpoint not in stats:
+            stats[endpoint] = EndpointStats()
+        stats[endpoint].add(entry)
+    return stats
@@ -1,9 +1,16 @@
 from pathlib import Path
+import atexit
+import copy
+import json
 import logging
 import logging.handlers
+import queue
 import sys
 import os
+import threading
+from contextvars import ContextVar
 from datetime import datetime
+from typing import Optional
 
 # Determine logs directory based on environment
 # In production: /home/ahmedbilal/workspace/logs
@@ -34,23 +41,173 @@ def get_logs_dir():
 
 LOGS_DIR = get_logs_dir()
 
-# Rest of logging config
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
+# Records wait in a bounded queue and are written by a background thread, so
+# the event loop never blocks on stdout, disk writes or rotation.
+#   LOG_QUEUE_SIZE    records the queue holds before the overflow policy applies
+#   LOG_QUEUE_POLICY  "drop" discards and counts records when the queue is full;
+#                     "block" makes the logging thread wait for room
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+LOG_QUEUE_POLICY = os.environ.get('LOG_QUEUE_POLICY', 'drop')
+
+# Id of the request being handled, set by the log_requests middleware in main.py
+request_id_var: ContextVar[Optional[str]] = ContextVar('request_id', default=None)
+
+# LogRecord attributes that are not `extra` fields
+_RECORD_ATTRS = frozenset(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {
+    'message', 'asctime', 'taskName', 'request_id', '_json',
+}
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, in the shape log_analytics_mcp.py reads
+
+    timestamp is naive UTC ISO 8601. `extra` fields (endpoint, duration_ms,
+    ...) become top-level keys. The line is kept on the record, so app.log,
+    errors.log and stdout share one encoding per record.
+    """
+
+    def format(self, record):
+        line = getattr(record, '_json', None)
+        if line is not None:
+            return line
+        entry = {
+            'timestamp': datetime.utcfromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'message': record.getMessage(),
+        }
+        request_id = getattr(record, 'request_id', None)
+        if request_id is not None:
+            entry['request_id'] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key not in entry:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        line = json.dumps(entry, default=str)
+        record._json = line
+        return line
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops or blocks on a full queue and counts drops"""
+
+    def __init__(self, log_queue: queue.Queue, policy: str = 'drop'):
+        if policy not in ('drop', 'block'):
+            raise ValueError(f"Unknown log queue policy {policy!r}; use 'drop' or 'block'")
+        super().__init__(log_queue)
+        self.policy = policy
+        self.dropped = 0
+        self._drop_lock = threading.Lock()
+
+    def prepare(self, record):
+        """Resolve what depends on the calling thread; JSON encoding waits for the writer
+
+        Unlike QueueHandler.prepare, the traceback stays in exc_text rather than
+        being appended to the message, so it can be logged as its own field.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        record.request_id = request_id_var.get()
+        return record
+
+    def enqueue(self, record):
+        if self.policy == 'block':
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._drop_lock:
+                self.dropped += 1
+
+    def stats(self) -> dict:
+        return {
+            'policy': self.policy,
+            'capacity': self.queue.maxsize,
+            'queued': self.queue.qsize(),
+            'dropped': self.dropped,
+        }
+
+_traceback_formatter = logging.Formatter()
+
+class DrainingQueueListener(logging.handlers.QueueListener):
+    """QueueListener whose stop() waits for room instead of failing on a full queue"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+_queue_handler = None
+_listener = None
+
+def setup_logging(level=logging.INFO, queue_size: int = None, policy: str = None):
+    """Route the root logger through a bounded queue to stdout, app.log and errors.log
+
+    Safe to call more than once; later calls keep the running pipeline.
+    """
+    global _queue_handler, _listener
+    if _listener is not None:
+        return _queue_handler
+    
+    formatter = JSONFormatter()
+    error_handler = logging.handlers.RotatingFileHandler(
+        LOGS_DIR / 'errors.log',
+        maxBytes=10485760,  # 10MB
+        backupCount=5
+    )
+    error_handler.setLevel(logging.ERROR)
+    handlers = [
         logging.StreamHandler(sys.stdout),
         logging.handlers.RotatingFileHandler(
             LOGS_DIR / 'app.log',
             maxBytes=10485760,  # 10MB
             backupCount=5
-        )
+        ),
+        error_handler,
     ]
-)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    
+    log_queue = queue.Queue(LOG_QUEUE_SIZE if queue_size is None else queue_size)
+    _queue_handler = BoundedQueueHandler(log_queue, LOG_QUEUE_POLICY if policy is None else policy)
+    _listener = DrainingQueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    atexit.register(shutdown_logging)
+    return _queue_handler
 
-def setup_logging():
-    pass
+def shutdown_logging():
+    """Write out every queued record, then flush and close the handlers"""
+    global _queue_handler, _listener
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        try:
+            handler.flush()
+            handler.close()
+        except (OSError, ValueError):
+            # As in logging.shutdown: stdout may already be closed at interpreter exit
+            pass
+    _queue_handler = _listener = None
+
+def get_logging_stats() -> dict:
+    """Queue depth and dropped-record count of the logging pipeline"""
+    if _queue_handler is None:
+        return {'policy': None, 'capacity': 0, 'queued': 0, 'dropped': 0}
+    return _queue_handler.stats()
 
 def get_logger(name):
     return logging.getLogger(name)
-
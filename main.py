@@ -2,19 +2,34 @@
 Task Management API - Main Application
 Demo for Admin-Governed Staging Environment
 """
-from fastapi import FastAPI, Depends, HTTPException, status, Request
+from fastapi import FastAPI, Depends, HTTPException, Query, status, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
-from typing import List
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import Match
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlencode
+import anyio.to_thread
 import os
 import time
+import uuid
 
 import crud
+import metrics
 import models
 import schemas
-from database import engine, get_db, init_db
-from logging_config import setup_logging, get_logger
+import etags
+import security
+import task_io
+from cache import response_cache
+from log_sampling import request_sampler
+from pagination import decode_id_cursor, decode_search_cursor, encode_cursor, next_id_cursor
+from database import engine, get_db, get_engine_profile, init_db
+from logging_config import get_logger, get_logging_stats, request_id_var, setup_logging, shutdown_logging
 
 # Setup structured logging
 setup_logging()
@@ -22,6 +37,7 @@ logger = get_logger(__name__)
 
 # Initialize database
 models.Base.metadata.create_all(bind=engine)
+metrics.instrument_engine(engine)
 
 # FastAPI application setup
 # Creates the main FastAPI instance with OpenAPI documentation metadata.
@@ -47,98 +63,289 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Request-ID"],
 )
 
 # Request logging middleware
+# Client-supplied X-Request-ID values are truncated to this length
+REQUEST_ID_MAX_LENGTH = 128
+
+@lru_cache(maxsize=4096)
+def _resolve_route_template(app, method: str, path: str) -> str:
+    # Same precedence as the router: the first full match wins, and a route
+    # matching only the path (wrong method, e.g. GET /api/tasks/bulk) is the fallback
+    scope = {"type": "http", "method": method, "path": path, "root_path": ""}
+    partial = None
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", None) or "unmatched"
+        if match == Match.PARTIAL and partial is None:
+            partial = route
+    return getattr(partial, "path", None) or "unmatched"
+
+def route_template(request: Request) -> str:
+    """Path template of the route the request will match, so /api/tasks/1 and /api/tasks/2 group together
+
+    Resolved before the request is handled, so in-flight requests can be
+    labelled too, and cached per method and path.
+    """
+    return _resolve_route_template(request.app, request.method, request.scope["path"])
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    """Log all HTTP requests with timing and response status"""
-    start_time = time.time()
+    """Log one record per HTTP request with timing and response status
+
+    Every record logged while handling the request carries its request id,
+    taken from X-Request-ID or generated, and echoed in the response. Fast
+    successful requests are sampled by log_sampling.request_sampler; the
+    record's sample_weight is the number of requests it stands for.
+    """
+    if request.url.path == "/metrics":
+        # Scrapes are neither logged nor counted
+        return await call_next(request)
     
-    # Log incoming request
-    logger.info(
-        f"Incoming request: {request.method} {request.url.path}",
-        extra={
-            "method": request.method,
-            "endpoint": request.url.path,
-            "client_ip": request.client.host if request.client else "unknown"
-        }
-    )
+    start_time = time.time()
+    request_id = request.headers.get("x-request-id", "")[:REQUEST_ID_MAX_LENGTH] or uuid.uuid4().hex
+    request_id_token = request_id_var.set(request_id)
+    route = route_template(request)
+    in_flight = metrics.labels(method=request.method, route=route)
+    metrics.registry.inc("http_requests_in_flight", in_flight)
+    query_count, query_count_token = metrics.count_queries()
     
     try:
         response = await call_next(request)
         duration_ms = (time.time() - start_time) * 1000
+        content_length = response.headers.get("content-length")
+        metrics.record_request(
+            request.method, route, response.status_code, duration_ms / 1000,
+            int(content_length) if content_length is not None else None, query_count[0]
+        )
         
         # Log response
-        logger.info(
-            f"Request completed: {request.method} {request.url.path} - {response.status_code}",
-            extra={
-                "method": request.method,
-                "endpoint": request.url.path,
-                "status_code": response.status_code,
-                "duration_ms": round(duration_ms, 2)
-            }
-        )
+        sample_weight = request_sampler.sample(route, response.status_code, duration_ms)
+        if sample_weight is not None:
+            logger.info(
+                f"Request completed: {request.method} {request.url.path} - {response.status_code}",
+                extra={
+                    "method": request.method,
+                    "endpoint": request.url.path,
+                    "route": route,
+                    "client_ip": request.client.host if request.client else "unknown",
+                    "status_code": response.status_code,
+                    "duration_ms": round(duration_ms, 2),
+                    "response_bytes": int(content_length) if content_length is not None else None,
+                    "sample_weight": sample_weight
+                }
+            )
         
+        response.headers["X-Request-ID"] = request_id
         return response
     except Exception as e:
         duration_ms = (time.time() - start_time) * 1000
+        metrics.record_request(request.method, route, 500, duration_ms / 1000, None, query_count[0])
         logger.error(
             f"Request failed: {request.method} {request.url.path} - {str(e)}",
             extra={
                 "method": request.method,
                 "endpoint": request.url.path,
-                "duration_ms": round(duration_ms, 2)
+                "route": route,
+                "client_ip": request.client.host if request.client else "unknown",
+                "duration_ms": round(duration_ms, 2),
+                "sample_weight": 1
             },
             exc_info=True
         )
         raise
+    finally:
+        metrics.registry.inc("http_requests_in_flight", in_flight, -1)
+        metrics.reset_query_count(query_count_token)
+        request_id_var.reset(request_id_token)
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup"""
+    """Initialize logging and the database on startup"""
+    # No-op on first start; restarts the log writer if a previous shutdown stopped it
+    setup_logging()
+    metrics.start_snapshot_writer()
     logger.info("🚀 Starting Task Management API")
     init_db()
     logger.info("✅ Database initialized")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the password hasher and flush queued log records"""
+    security.shutdown_hasher()
+    metrics.stop_snapshot_writer()
+    shutdown_logging()
+
 # API Router
 from fastapi import APIRouter
 api_router = APIRouter(prefix="/api")
 
+# Tasks embedded in GET /api/users/{user_id} by default; the rest are reached with next_tasks_cursor
+USER_TASKS_PAGE_SIZE = 50
+
+def parse_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Translate the opaque cursor query parameter into the last seen id"""
+    if cursor is None:
+        return None
+    try:
+        return decode_id_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def next_cursor_headers(rows: list, limit: int) -> Dict[str, str]:
+    """Expose the keyset cursor for the following page, if there is one"""
+    cursor = next_id_cursor(rows, limit)
+    return {"X-Next-Cursor": cursor} if cursor else {}
+
+@lru_cache(maxsize=None)
+def response_adapter(response_type) -> TypeAdapter:
+    # Built once per response type; validators and serializers are compiled at construction
+    return TypeAdapter(response_type)
+
+def render_json(response_type, content) -> bytes:
+    """Validate content against response_type and serialize it to JSON bytes
+
+    Routes return the bytes in a Response, so FastAPI does not validate the
+    result a second time, while their response_model still documents the
+    schema. pydantic-core writes the JSON directly, skipping the
+    jsonable_encoder dict pass and stdlib json; see
+    benchmarks/bench_serialization.py.
+    """
+    adapter = response_adapter(response_type)
+    return adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+
+class CachedRead:
+    """Conditional, cached GET keyed by route path and sorted query parameters
+
+    `response` is set when the request can be answered without the database:
+    a 304 if If-None-Match matches the cached ETag, otherwise the cached body.
+    """
+    
+    def __init__(self, request: Request):
+        self.key = f"{request.url.path}?{urlencode(sorted(request.query_params.multi_items()))}"
+        self.if_none_match = request.headers.get("if-none-match")
+        # Taken before the database read so a concurrent write voids the fill
+        self.token = response_cache.fill_token()
+        cached = response_cache.get(self.key)
+        self.response = None
+        if cached is not None:
+            self.response = self.not_modified(cached.headers.get("ETag"), cached.headers) or Response(
+                cached.body, media_type="application/json", headers=cached.headers
+            )
+    
+    def not_modified(self, etag: Optional[str], headers: Dict[str, str] = None) -> Optional[Response]:
+        """304 response if the client already holds etag"""
+        if etag is None or not etags.if_none_match(self.if_none_match, etag):
+            return None
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validator_headers(etag, headers))
+    
+    def respond(self, response_type, content, tags: Iterable[str], etag: str,
+                headers: Dict[str, str] = None) -> Response:
+        """304 if etag matches, else serialize content, cache it and return it"""
+        not_modified = self.not_modified(etag, headers)
+        if not_modified:
+            return not_modified
+        headers = validator_headers(etag, headers)
+        body = render_json(response_type, content)
+        response_cache.set(self.key, body, tags=tags, headers=headers, token=self.token)
+        return Response(body, media_type="application/json", headers=headers)
+
+def validator_headers(etag: str, headers: Dict[str, str] = None) -> Dict[str, str]:
+    # no-cache lets browsers keep the body but revalidate it on every use
+    return {**(headers or {}), "ETag": etag, "Cache-Control": "no-cache"}
+
+def owner_tag(user_id: Optional[int]) -> str:
+    # Listings without a user filter can change on any task write
+    return f"owner:{user_id}" if user_id else "tasks"
+
+def invalidate_tasks(owner_id: int, task_id: int = None):
+    """Drop cached reads that a write to owner_id's tasks can change"""
+    tags = ["tasks", f"owner:{owner_id}"]
+    if task_id is not None:
+        tags.append(f"task:{task_id}")
+    response_cache.invalidate(*tags)
+
 # Health check
 @api_router.get("/health")
 def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "environment": "staging"}
+    return {
+        "status": "healthy",
+        "environment": "staging",
+        "database": get_engine_profile(),
+        "password_hasher": security.hasher_stats.snapshot(),
+        "logging": {**get_logging_stats(), "request_sampling": request_sampler.stats()},
+    }
 
 # User endpoints
 @api_router.post("/users/", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    """Create a new user"""
+async def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    """Create a new user
+
+    Async so the bcrypt hash can be awaited from the hasher pool; the queries
+    run on the threadpool like the sync routes.
+    """
     # Check if user exists
-    db_user = crud.get_user_by_email(db, email=user.email)
+    db_user = await run_in_threadpool(crud.get_user_by_email, db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    db_user = crud.get_user_by_username(db, username=user.username)
+    db_user = await run_in_threadpool(crud.get_user_by_username, db, username=user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already taken")
     
-    return crud.create_user(db=db, user=user)
+    hashed_password = await security.hash_password_async(user.password)
+    db_user = await run_in_threadpool(crud.create_user, db, user, hashed_password)
+    response_cache.invalidate("users")
+    return db_user
 
 @api_router.get("/users/", response_model=List[schemas.User])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all users"""
-    users = crud.get_users(db, skip=skip, limit=limit)
-    return users
+def read_users(request: Request, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+               db: Session = Depends(get_db)):
+    """Get all users
+
+    Pass the X-Next-Cursor header of a page back as `cursor` to fetch the next
+    page with a keyset seek; `skip` is ignored in that mode.
+    """
+    cache = CachedRead(request)
+    if cache.response:
+        return cache.response
+    
+    users = crud.get_users(db, skip=skip, limit=limit, after_id=parse_cursor(cursor))
+    return cache.respond(
+        List[schemas.User], users, tags=["users"], etag=etags.rows_etag(cache.key, users),
+        headers=next_cursor_headers(users, limit)
+    )
 
 @api_router.get("/users/{user_id}", response_model=schemas.UserWithTasks)
-def read_user(user_id: int, db: Session = Depends(get_db)):
-    """Get user by ID with their tasks"""
+def read_user(request: Request, user_id: int,
+              tasks_limit: int = Query(USER_TASKS_PAGE_SIZE, ge=1, le=1000),
+              summary: bool = False, db: Session = Depends(get_db)):
+    """Get user by ID with the first page of their tasks
+
+    `summary=true` returns per-priority and completion counts instead of tasks.
+    """
+    cache = CachedRead(request)
+    if cache.response:
+        return cache.response
+    
     db_user = crud.get_user(db, user_id=user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return db_user
+    
+    user = schemas.User.model_validate(db_user).model_dump()
+    if summary:
+        task_counts = crud.get_task_counts(db, user_id=user_id)
+        content = {**user, "task_counts": task_counts}
+        etag = etags.compute_etag(cache.key, user_id, task_counts.model_dump())
+    else:
+        tasks = crud.get_tasks(db, limit=tasks_limit, user_id=user_id)
+        content = {**user, "tasks": tasks, "next_tasks_cursor": next_id_cursor(tasks, tasks_limit)}
+        etag = etags.rows_etag(cache.key, tasks, user_id)
+    return cache.respond(schemas.UserWithTasks, content, tags=[f"user:{user_id}", owner_tag(user_id)], etag=etag)
 
 # Task endpoints
 @api_router.post("/users/{user_id}/tasks/", response_model=schemas.Task, status_code=status.HTTP_201_CREATED)
@@ -148,46 +355,214 @@ def create_task(user_id: int, task: schemas.TaskCreate, db: Session = Depends(ge
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return crud.create_task(db=db, task=task, user_id=user_id)
+    db_task = crud.create_task(db=db, task=task, user_id=user_id)
+    invalidate_tasks(user_id)
+    return db_task
+
+@api_router.post("/users/{user_id}/tasks/bulk", response_model=schemas.TaskBulkCreateResult,
+                 status_code=status.HTTP_201_CREATED)
+def create_tasks_bulk(user_id: int, tasks: List[schemas.TaskCreate], db: Session = Depends(get_db)):
+    """Create many tasks for a user in a single transaction"""
+    db_user = crud.get_user(db, user_id=user_id)
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    ids, created_at = crud.create_tasks_bulk(db, tasks=tasks, user_id=user_id)
+    invalidate_tasks(user_id)
+    return {"created": len(ids), "ids": ids, "created_at": created_at}
 
 @api_router.get("/tasks/", response_model=List[schemas.Task])
-def read_tasks(skip: int = 0, limit: int = 100, user_id: int = None, db: Session = Depends(get_db)):
-    """Get all tasks, optionally filtered by user"""
-    tasks = crud.get_tasks(db, skip=skip, limit=limit, user_id=user_id)
-    return tasks
+def read_tasks(request: Request, skip: int = 0, limit: int = 100, user_id: int = None,
+               cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    """Get all tasks, optionally filtered by user
+
+    Pass the X-Next-Cursor header of a page back as `cursor` to fetch the next
+    page with a keyset seek; `skip` is ignored in that mode.
+    """
+    cache = CachedRead(request)
+    if cache.response:
+        return cache.response
+    
+    tasks = crud.get_tasks(db, skip=skip, limit=limit, user_id=user_id, after_id=parse_cursor(cursor))
+    return cache.respond(
+        List[schemas.Task], tasks, tags=[owner_tag(user_id)], etag=etags.rows_etag(cache.key, tasks),
+        headers=next_cursor_headers(tasks, limit)
+    )
+
+# Search and bulk routes are registered before /tasks/{task_id} so their paths are not parsed as an id
+@api_router.get("/tasks/search", response_model=List[schemas.Task])
+def search_tasks(request: Request, q: str = Query(..., min_length=1, max_length=256), user_id: int = None,
+                 limit: int = Query(20, ge=1, le=100), cursor: Optional[str] = None,
+                 db: Session = Depends(get_db)):
+    """Full-text search over task titles and descriptions, best matches first
+    
+    Every word in `q` must appear; results are ranked by bm25 with title
+    matches weighted above description matches. Pass the X-Next-Cursor header
+    of a page back as `cursor` to fetch the next page.
+    """
+    after = None
+    if cursor is not None:
+        try:
+            after = decode_search_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    cache = CachedRead(request)
+    if cache.response:
+        return cache.response
+    
+    results = crud.search_tasks(db, query=q, user_id=user_id, limit=limit, after=after)
+    tasks = [task for task, _ in results]
+    headers = {}
+    if len(results) == limit:
+        last_task, last_score = results[-1]
+        headers["X-Next-Cursor"] = encode_cursor({"score": last_score, "id": last_task.id})
+    return cache.respond(
+        List[schemas.Task], tasks, tags=[owner_tag(user_id)], etag=etags.rows_etag(cache.key, tasks),
+        headers=headers
+    )
+
+@api_router.get("/tasks/export")
+def export_tasks(format: str = Query("ndjson", pattern="^(ndjson|csv)$"), user_id: int = None,
+                 priority: Optional[str] = None, completed: Optional[bool] = None,
+                 db: Session = Depends(get_db)):
+    """Stream every matching task as NDJSON or CSV, ordered by id
+
+    Rows are read from a server-side cursor and written out batch by batch,
+    so memory use does not depend on how many tasks are exported.
+    """
+    if priority is not None and priority not in ["low", "medium", "high"]:
+        raise HTTPException(status_code=400, detail="Invalid priority. Must be: low, medium, or high")
+    task_filter = schemas.TaskFilter(owner_id=user_id, priority=priority, completed=completed)
+    
+    def body():
+        # The body outlives the request's session, so the export reads through its own
+        with Session(db.get_bind()) as export_db:
+            yield from task_io.encode_tasks(crud.stream_tasks(export_db, task_filter), format)
+    
+    return StreamingResponse(
+        body(), media_type=task_io.EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format}"'}
+    )
+
+@api_router.post("/tasks/import", response_model=schemas.TaskImportResult)
+async def import_tasks(request: Request, format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+                       user_id: int = None, start_row: int = Query(1, ge=1),
+                       batch_size: int = Query(1000, ge=1, le=10000), db: Session = Depends(get_db)):
+    """Import tasks from an NDJSON or CSV request body, in the export's format
+
+    Each row may carry an owner_id; `user_id` is the owner for rows without
+    one. The body is read as it arrives and every `batch_size` rows are
+    validated and committed together, so invalid rows are reported without
+    aborting the import. Resume a failed import with `start_row=next_row`.
+    """
+    try:
+        result = await task_io.import_tasks(
+            db, request.stream(), format, user_id=user_id, start_row=start_row, batch_size=batch_size
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Unreadable upload: {e}")
+    finally:
+        # Batches committed before any failure are visible too
+        response_cache.clear()
+    return result
+
+@api_router.patch("/tasks/bulk", response_model=schemas.TaskBulkResult)
+def bulk_update_tasks(bulk_update: schemas.TaskBulkUpdate, db: Session = Depends(get_db)):
+    """Update every task matching an id list and/or filter"""
+    try:
+        affected = crud.bulk_update_tasks(
+            db, task_update=bulk_update.update, ids=bulk_update.ids, task_filter=bulk_update.filter
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # A filter can touch any owner, so drop every cached read
+    response_cache.clear()
+    return {"affected": affected}
+
+@api_router.delete("/tasks/bulk", response_model=schemas.TaskBulkResult)
+def bulk_delete_tasks(bulk_delete: schemas.TaskBulkDelete, db: Session = Depends(get_db)):
+    """Delete every task matching an id list and/or filter"""
+    try:
+        affected = crud.bulk_delete_tasks(db, ids=bulk_delete.ids, task_filter=bulk_delete.filter)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # A filter can touch any owner, so drop every cached read
+    response_cache.clear()
+    return {"affected": affected}
 
 @api_router.get("/tasks/{task_id}", response_model=schemas.Task)
-def read_task(task_id: int, db: Session = Depends(get_db)):
+def read_task(request: Request, task_id: int, db: Session = Depends(get_db)):
     """Get task by ID"""
+    cache = CachedRead(request)
+    if cache.response:
+        return cache.response
+    
     db_task = crud.get_task(db, task_id=task_id)
     if db_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
-    return db_task
+    return cache.respond(schemas.Task, db_task, tags=[f"task:{task_id}"], etag=etags.task_etag(db_task))
 
 @api_router.patch("/tasks/{task_id}", response_model=schemas.Task)
-def update_task(task_id: int, task_update: schemas.TaskUpdate, db: Session = Depends(get_db)):
-    """Update a task"""
-    db_task = crud.update_task(db, task_id=task_id, task_update=task_update)
+def update_task(request: Request, response: Response, task_id: int, task_update: schemas.TaskUpdate,
+                db: Session = Depends(get_db)):
+    """Update a task
+
+    Send the task's ETag in If-Match to reject the update with 412 if the
+    task changed since it was read.
+    """
+    if_match = request.headers.get("if-match")
+    expected_updated_at = None
+    if if_match is not None:
+        db_task = crud.get_task(db, task_id=task_id)
+        if db_task is None:
+            raise HTTPException(status_code=404, detail="Task not found")
+        if not etags.if_match(if_match, etags.task_etag(db_task)):
+            raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Task has been modified")
+        if if_match.strip() != "*":
+            # Checked again by the UPDATE itself, so a write committed since this read fails with 412 too
+            expected_updated_at = db_task.updated_at
+    
+    db_task = crud.update_task(
+        db, task_id=task_id, task_update=task_update, expected_updated_at=expected_updated_at
+    )
     if db_task is None:
+        if expected_updated_at is not None and crud.get_task(db, task_id=task_id) is not None:
+            raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Task has been modified")
         raise HTTPException(status_code=404, detail="Task not found")
+    invalidate_tasks(db_task.owner_id, task_id)
+    response.headers["ETag"] = etags.task_etag(db_task)
     return db_task
 
 @api_router.delete("/tasks/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_task(task_id: int, db: Session = Depends(get_db)):
     """Delete a task"""
+    db_task = crud.get_task(db, task_id=task_id)
+    if db_task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    owner_id = db_task.owner_id
+    
     success = crud.delete_task(db, task_id=task_id)
     if not success:
         raise HTTPException(status_code=404, detail="Task not found")
+    invalidate_tasks(owner_id, task_id)
     return None
 
 @api_router.get("/tasks/priority/{priority}", response_model=List[schemas.Task])
-def read_tasks_by_priority(priority: str, user_id: int = None, db: Session = Depends(get_db)):
+def read_tasks_by_priority(request: Request, priority: str, user_id: int = None,
+                           db: Session = Depends(get_db)):
     """Get tasks by priority (low, medium, high)"""
     if priority not in ["low", "medium", "high"]:
         raise HTTPException(status_code=400, detail="Invalid priority. Must be: low, medium, or high")
     
+    cache = CachedRead(request)
+    if cache.response:
+        return cache.response
+    
     tasks = crud.get_tasks_by_priority(db, priority=priority, user_id=user_id)
-    return tasks
+    return cache.respond(
+        List[schemas.Task], tasks, tags=[owner_tag(user_id)], etag=etags.rows_etag(cache.key, tasks)
+    )
 
 @api_router.get("/stats/completed")
 def get_completed_stats(user_id: int = None, db: Session = Depends(get_db)):
@@ -195,6 +570,36 @@ def get_completed_stats(user_id: int = None, db: Session = Depends(get_db)):
     count = crud.get_completed_tasks_count(db, user_id=user_id)
     return {"completed_tasks": count, "user_id": user_id}
 
+@api_router.get("/stats/summary", response_model=schemas.TaskSummary)
+def get_summary_stats(user_id: int = None, db: Session = Depends(get_db)):
+    """Total, completed and pending task counts by priority, for everyone or one user
+
+    Served from the task_counters table, so the cost does not grow with the number of tasks.
+    """
+    counts = crud.get_task_counts(db, user_id=user_id)
+    return {**counts.model_dump(), "user_id": user_id}
+
+@api_router.get("/cache/stats")
+def get_cache_stats():
+    """Hit, miss, eviction and memory counters for the response cache"""
+    return response_cache.stats()
+
+# Prometheus scrape target; registered before the static mount, outside /api
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Request, database and thread pool metrics in Prometheus text format
+
+    Thread pool gauges describe the worker answering the scrape.
+    """
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter_stats = limiter.statistics()
+    gauges = {
+        "threadpool_threads_busy": limiter_stats.borrowed_tokens,
+        "threadpool_threads_max": limiter.total_tokens,
+        "threadpool_tasks_waiting": limiter_stats.tasks_waiting,
+    }
+    return Response(metrics.render(metrics.collect(), gauges), media_type=metrics.CONTENT_TYPE)
+
 # Include API router
 app.include_router(api_router)
 
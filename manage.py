@@ -0,0 +1,51 @@
+"""
+Maintenance commands for the staging database
+
+    python manage.py migrate            apply pending schema migrations
+    python manage.py rebuild-counters   recompute task_counters from tasks
+    python manage.py reindex-search     rebuild the tasks_fts full-text index
+"""
+import argparse
+
+import crud
+import migrations
+from database import SessionLocal, engine, init_db
+
+def migrate(args):
+    init_db()
+    with engine.connect() as conn:
+        print(f"Database schema at version {migrations.get_schema_version(conn)}")
+
+def rebuild_counters(args):
+    db = SessionLocal()
+    try:
+        crud.rebuild_task_counters(db)
+        db.commit()
+        counts = crud.get_task_counts(db)
+        print(f"✅ Rebuilt task counters: {counts.total} tasks, {counts.completed} completed")
+    finally:
+        db.close()
+
+def reindex_search(args):
+    db = SessionLocal()
+    try:
+        crud.rebuild_search_index(db)
+        db.commit()
+        print("✅ Rebuilt task search index")
+    finally:
+        db.close()
+
+COMMANDS = {
+    "migrate": migrate,
+    "rebuild-counters": rebuild_counters,
+    "reindex-search": reindex_search,
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Task Management maintenance commands")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args(argv)
+    COMMANDS[args.command](args)
+
+if __name__ == "__main__":
+    main()
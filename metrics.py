@@ -0,0 +1,284 @@
+"""
+Prometheus metrics for HTTP requests, database queries and the thread pool
+
+Recording happens on the hot path, so every thread writes to its own shard
+(plain dicts, no locks) and shards are only merged when /metrics is scraped.
+With several uvicorn workers, set METRICS_DIR to a directory shared by the
+workers: each one writes its merged snapshot there every
+METRICS_FLUSH_SECONDS, and a scrape of any worker adds up every snapshot.
+Gauges from workers that have exited are ignored; their counters are kept.
+"""
+import bisect
+import glob
+import json
+import os
+import tempfile
+import threading
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    "http_requests_total": ("counter", "HTTP requests by method, route template and status", None),
+    "http_request_duration_seconds": (
+        "histogram", "HTTP request latency by method and route template", LATENCY_BUCKETS
+    ),
+    "http_requests_in_flight": ("gauge", "HTTP requests being handled by method and route template", None),
+    "http_response_size_bytes": (
+        "histogram", "HTTP response body size by method and route template", SIZE_BUCKETS
+    ),
+    "db_queries_total": ("counter", "Database statements executed while handling requests", None),
+    "threadpool_threads_busy": ("gauge", "Worker threads running sync endpoints and dependencies", None),
+    "threadpool_threads_max": ("gauge", "Capacity of the worker thread pool", None),
+    "threadpool_tasks_waiting": ("gauge", "Tasks queued for a free worker thread", None),
+}
+
+METRICS_DIR = os.environ.get("METRICS_DIR")
+METRICS_FLUSH_SECONDS = float(os.environ.get("METRICS_FLUSH_SECONDS", 1.0))
+
+def labels(**values) -> str:
+    """Label pairs in exposition format, e.g. method="GET",route="/api/tasks/" """
+    return ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in values.items()
+    )
+
+class _Shard:
+    __slots__ = ("values", "histograms")
+
+    def __init__(self):
+        # (name, labels) -> value, and (name, labels) -> [per-bucket counts..., +Inf count, sum]
+        self.values: Dict[tuple, float] = {}
+        self.histograms: Dict[tuple, list] = {}
+
+def _items(mapping: dict) -> list:
+    # Another thread may add a series mid-copy; the copy is retried, never locked
+    while True:
+        try:
+            return list(mapping.items())
+        except RuntimeError:
+            continue
+
+class MetricsRegistry:
+    """Counters, gauges and histograms sharded per thread"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name: str, label_pairs: str = "", value: float = 1):
+        """Add to a counter, or to a gauge when value may be negative"""
+        values = self._shard().values
+        key = (name, label_pairs)
+        values[key] = values.get(key, 0) + value
+
+    def observe(self, name: str, label_pairs: str, value: float):
+        buckets = METRICS[name][2]
+        histograms = self._shard().histograms
+        key = (name, label_pairs)
+        counts = histograms.get(key)
+        if counts is None:
+            counts = histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(buckets, value)] += 1
+        counts[-1] += value
+
+    def snapshot(self) -> dict:
+        """Merge every thread's shard into {"values": {...}, "histograms": {...}}"""
+        with self._shards_lock:
+            shards = list(self._shards)
+        snapshot = {"values": {}, "histograms": {}}
+        for shard in shards:
+            _merge(snapshot, {"values": dict(_items(shard.values)), "histograms": {
+                key: list(counts) for key, counts in _items(shard.histograms)
+            }})
+        return snapshot
+
+def _merge(into: dict, other: dict, gauges: bool = True):
+    values = into["values"]
+    for key, value in other["values"].items():
+        if not gauges and METRICS[key[0]][0] == "gauge":
+            continue
+        values[key] = values.get(key, 0) + value
+    histograms = into["histograms"]
+    for key, counts in other["histograms"].items():
+        merged = histograms.get(key)
+        if merged is None:
+            histograms[key] = list(counts)
+        else:
+            for i, count in enumerate(counts):
+                merged[i] += count
+
+registry = MetricsRegistry()
+
+def record_request(method: str, route: str, status_code: int, duration_seconds: float,
+                   response_size: Optional[int], queries: int):
+    series = labels(method=method, route=route)
+    registry.inc("http_requests_total", labels(method=method, route=route, status=status_code))
+    registry.observe("http_request_duration_seconds", series, duration_seconds)
+    if response_size is not None:
+        registry.observe("http_response_size_bytes", series, response_size)
+    if queries:
+        registry.inc("db_queries_total", labels(route=route), queries)
+
+# Statement count for the request being handled; a list so the threadpool worker's copied context shares it
+_query_count: ContextVar[Optional[list]] = ContextVar("db_query_count", default=None)
+
+def count_queries():
+    """Start counting statements in this context; returns (counter, token for reset_query_count)"""
+    counter = [0]
+    return counter, _query_count.set(counter)
+
+def reset_query_count(token):
+    _query_count.reset(token)
+
+def _on_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_count.get()
+    if counter is not None:
+        counter[0] += 1
+
+def instrument_engine(engine):
+    """Count statements run on engine toward the request being handled"""
+    event.listen(engine, "before_cursor_execute", _on_cursor_execute)
+
+# Multi-worker aggregation through per-process snapshot files
+
+def _snapshot_path(metrics_dir: str, pid: int) -> str:
+    return os.path.join(metrics_dir, f"metrics_{pid}.json")
+
+def write_snapshot(metrics_dir: str = None):
+    """Atomically replace this process's snapshot file"""
+    metrics_dir = metrics_dir or METRICS_DIR
+    snapshot = registry.snapshot()
+    data = {
+        "values": [[name, pairs, value] for (name, pairs), value in snapshot["values"].items()],
+        "histograms": [[name, pairs, counts] for (name, pairs), counts in snapshot["histograms"].items()],
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=metrics_dir, prefix=".metrics_")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, _snapshot_path(metrics_dir, os.getpid()))
+
+def _read_snapshot(path: str) -> Optional[dict]:
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return {
+        "values": {(name, pairs): value for name, pairs, value in data["values"]},
+        "histograms": {(name, pairs): counts for name, pairs, counts in data["histograms"]},
+    }
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def collect(metrics_dir: str = None) -> dict:
+    """This process's live metrics plus every other worker's latest snapshot"""
+    metrics_dir = metrics_dir or METRICS_DIR
+    snapshot = registry.snapshot()
+    if not metrics_dir:
+        return snapshot
+    for path in glob.glob(os.path.join(metrics_dir, "metrics_*.json")):
+        try:
+            pid = int(os.path.basename(path)[len("metrics_"):-len(".json")])
+        except ValueError:
+            continue
+        if pid == os.getpid():
+            continue
+        other = _read_snapshot(path)
+        if other is not None:
+            _merge(snapshot, other, gauges=_pid_alive(pid))
+    return snapshot
+
+class SnapshotWriter(threading.Thread):
+    """Background thread writing this worker's snapshot every interval"""
+
+    def __init__(self, metrics_dir: str, interval: float):
+        super().__init__(name="metrics-snapshot-writer", daemon=True)
+        self.metrics_dir = metrics_dir
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            write_snapshot(self.metrics_dir)
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        write_snapshot(self.metrics_dir)
+
+_writer = None
+
+def start_snapshot_writer():
+    """Share this worker's metrics through METRICS_DIR; no-op when it is unset"""
+    global _writer
+    if not METRICS_DIR or _writer is not None:
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    _writer = SnapshotWriter(METRICS_DIR, METRICS_FLUSH_SECONDS)
+    _writer.start()
+
+def stop_snapshot_writer():
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
+
+def _format_value(value) -> str:
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+def _series(name: str, label_pairs: str) -> str:
+    return f"{name}{{{label_pairs}}}" if label_pairs else name
+
+def render(snapshot: dict, gauges: Dict[str, float] = None) -> str:
+    """Prometheus text exposition of a collected snapshot plus point-in-time gauges"""
+    values = dict(snapshot["values"])
+    for name, value in (gauges or {}).items():
+        values[(name, "")] = value
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "histogram":
+            for (series_name, label_pairs), counts in sorted(snapshot["histograms"].items()):
+                if series_name != name:
+                    continue
+                prefix = f"{label_pairs}," if label_pairs else ""
+                cumulative = 0
+                for bound, count in zip(buckets, counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{prefix}le="{float(bound)}"}} {cumulative}')
+                cumulative += counts[len(buckets)]
+                lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+                lines.append(f"{_series(name + '_sum', label_pairs)} {_format_value(counts[-1])}")
+                lines.append(f"{_series(name + '_count', label_pairs)} {cumulative}")
+        else:
+            for (series_name, label_pairs), value in sorted(values.items()):
+                if series_name == name:
+                    lines.append(f"{_series(name, label_pairs)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
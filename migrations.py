@@ -0,0 +1,67 @@
+"""
+Versioned schema migrations for existing SQLite databases
+
+`create_all` only creates missing tables, so changes to tables that already
+exist (new indexes, backfills) are applied here. The schema version is kept
+in SQLite's PRAGMA user_version and every pending migration runs in a single
+transaction.
+"""
+import crud
+import models
+from database import engine
+
+MIGRATIONS = []
+
+def migration(version: int):
+    """Register a migration function for the given schema version"""
+    def register(func):
+        MIGRATIONS.append((version, func))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return func
+    return register
+
+def get_schema_version(conn) -> int:
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+def upgrade(bind=engine) -> int:
+    """Apply all pending migrations and return the resulting schema version"""
+    with bind.begin() as conn:
+        version = get_schema_version(conn)
+        for target, func in MIGRATIONS:
+            if target > version:
+                func(conn)
+                conn.exec_driver_sql(f"PRAGMA user_version = {int(target)}")
+                version = target
+    return version
+
+@migration(1)
+def add_task_query_indexes(conn):
+    """Composite indexes for the task filters used in crud.py"""
+    # Spelled out rather than read from models.Task so later model changes
+    # cannot alter what this version applies
+    for statement in (
+        "CREATE INDEX IF NOT EXISTS ix_tasks_owner_id ON tasks (owner_id)",
+        "CREATE INDEX IF NOT EXISTS ix_tasks_owner_id_priority ON tasks (owner_id, priority)",
+        "CREATE INDEX IF NOT EXISTS ix_tasks_owner_id_completed ON tasks (owner_id, completed)",
+        "CREATE INDEX IF NOT EXISTS ix_tasks_priority ON tasks (priority)",
+        "CREATE INDEX IF NOT EXISTS ix_tasks_completed ON tasks (completed)",
+    ):
+        conn.exec_driver_sql(statement)
+
+@migration(2)
+def add_task_counters(conn):
+    """Counters table behind /api/stats/summary and the triggers maintaining it, backfilled from existing tasks"""
+    models.TaskCounter.__table__.create(conn, checkfirst=True)
+    for statement in models.TASK_COUNTER_TRIGGERS_DDL:
+        conn.exec_driver_sql(statement)
+    crud.rebuild_task_counters(conn)
+
+@migration(3)
+def add_task_search_index(conn):
+    """FTS5 index behind /api/tasks/search, built from existing tasks"""
+    for statement in models.TASKS_FTS_DDL:
+        conn.exec_driver_sql(statement)
+    crud.rebuild_search_index(conn)
+
+if __name__ == "__main__":
+    print(f"Database schema at version {upgrade()}")
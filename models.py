@@ -1,7 +1,7 @@
 """
 Database models
 """
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import DDL, Boolean, Column, Integer, String, DateTime, ForeignKey, Index, event
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -16,7 +16,8 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
-    tasks = relationship("Task", back_populates="owner")
+    # Unbounded for power users, so never lazy load; query a page with crud.get_tasks instead
+    tasks = relationship("Task", back_populates="owner", lazy="raise")
 
 class Task(Base):
     __tablename__ = "tasks"
@@ -29,6 +30,86 @@ class Task(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    owner_id = Column(Integer, ForeignKey("users.id"))
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True)
     owner = relationship("User", back_populates="tasks")
+    
+    # Indexes matching the crud.py query shapes. SQLite appends the rowid to
+    # every index, so ix_tasks_owner_id also serves owner listings ordered by id.
+    # The completed indexes serve export and bulk filters on completion, alone
+    # or with an owner, still in id order.
+    # Existing databases receive these through migrations.py.
+    __table_args__ = (
+        Index("ix_tasks_owner_id_priority", "owner_id", "priority"),
+        Index("ix_tasks_owner_id_completed", "owner_id", "completed"),
+        Index("ix_tasks_priority", "priority"),
+        Index("ix_tasks_completed", "completed"),
+    )
+
+
+class TaskCounter(Base):
+    """Task counts per owner, priority and completion state
+
+    Maintained by the triggers in TASK_COUNTER_TRIGGERS_DDL so stats never
+    count the tasks table; rebuild with `python manage.py rebuild-counters`.
+    """
+    __tablename__ = "task_counters"
+    
+    owner_id = Column(Integer, primary_key=True)
+    priority = Column(String, primary_key=True)
+    completed = Column(Boolean, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+# Full-text index over task titles and descriptions, read by crud.search_tasks.
+# External content: the text lives only in tasks, and the triggers keep the
+# index in step with every write path, including bulk and Core statements.
+# Existing databases receive it through migrations.py; rebuild it with
+# `python manage.py reindex-search`.
+TASKS_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+    "title, description, content='tasks', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+    "END",
+]
+
+for statement in TASKS_FTS_DDL:
+    event.listen(Task.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+# Triggers keeping task_counters in step with tasks. They run inside the
+# writing statement, so every path (ORM, Core bulk statements, imports) is
+# counted from the rows it actually changed. NULLs cannot be part of the
+# counter primary key, hence the COALESCEs; the INSERT OR IGNORE creates a
+# missing counter row before it is adjusted. Existing databases receive them
+# through migrations.py.
+def _counter_adjustment(row: str, delta: str) -> str:
+    key = (f"COALESCE({row}.owner_id, 0)", f"COALESCE({row}.priority, '')", f"COALESCE({row}.completed, 0)")
+    return (
+        f"INSERT OR IGNORE INTO task_counters (owner_id, priority, completed, count) VALUES ({', '.join(key)}, 0); "
+        f"UPDATE task_counters SET count = count {delta} "
+        f"WHERE owner_id = {key[0]} AND priority = {key[1]} AND completed = {key[2]}; "
+    )
+
+TASK_COUNTER_TRIGGERS_DDL = [
+    "CREATE TRIGGER IF NOT EXISTS task_counters_insert AFTER INSERT ON tasks BEGIN "
+    + _counter_adjustment("new", "+ 1") + "END",
+    "CREATE TRIGGER IF NOT EXISTS task_counters_delete AFTER DELETE ON tasks BEGIN "
+    + _counter_adjustment("old", "- 1") + "END",
+    "CREATE TRIGGER IF NOT EXISTS task_counters_update AFTER UPDATE OF owner_id, priority, completed ON tasks "
+    "WHEN COALESCE(old.owner_id, 0) != COALESCE(new.owner_id, 0) "
+    "OR COALESCE(old.priority, '') != COALESCE(new.priority, '') "
+    "OR COALESCE(old.completed, 0) != COALESCE(new.completed, 0) BEGIN "
+    + _counter_adjustment("old", "- 1") + _counter_adjustment("new", "+ 1") + "END",
+]
 
+for statement in TASK_COUNTER_TRIGGERS_DDL:
+    event.listen(Task.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+# The triggers go with the tasks table; the virtual table has to be dropped explicitly
+event.listen(Task.__table__, "before_drop", DDL("DROP TABLE IF EXISTS tasks_fts").execute_if(dialect="sqlite"))
@@ -0,0 +1,49 @@
+"""
+Opaque cursor helpers for keyset pagination
+"""
+import base64
+import json
+
+
+def encode_cursor(values: dict) -> str:
+    """Encode the sort key of the last row on a page into an opaque cursor"""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Decode a cursor produced by encode_cursor, raising ValueError if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, dict):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def decode_id_cursor(cursor: str) -> int:
+    """Decode a cursor ordered on id and return the last seen id"""
+    last_id = decode_cursor(cursor).get("id")
+    if not isinstance(last_id, int) or isinstance(last_id, bool):
+        raise ValueError("Invalid cursor")
+    return last_id
+
+
+def decode_search_cursor(cursor: str) -> tuple:
+    """Decode a cursor ordered on (score, id) and return the last seen pair"""
+    values = decode_cursor(cursor)
+    score, last_id = values.get("score"), values.get("id")
+    if not isinstance(score, (int, float)) or isinstance(score, bool):
+        raise ValueError("Invalid cursor")
+    if not isinstance(last_id, int) or isinstance(last_id, bool):
+        raise ValueError("Invalid cursor")
+    return score, last_id
+
+
+def next_id_cursor(rows: list, limit: int):
+    """Cursor for the page after rows, or None when this is the last page"""
+    if limit <= 0 or len(rows) < limit:
+        return None
+    return encode_cursor({"id": rows[-1].id})
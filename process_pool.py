@@ -0,0 +1,18 @@
+"""
+Process pools for CPU-bound work off the event loop
+
+The API and the log analytics server start their pools lazily, from
+whichever thread submits first, while logging, metrics and threadpool
+threads are running. Forking then could copy a lock another thread holds,
+so workers are started from a clean process instead: forkserver where the
+platform has it, spawn otherwise.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+def start_method() -> str:
+    return "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+def process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """A ProcessPoolExecutor whose workers are not forked from the calling process"""
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(start_method()))
@@ -30,6 +30,50 @@ class Task(TaskBase):
     class Config:
         from_attributes = True
 
+class TaskCountBreakdown(BaseModel):
+    total: int = 0
+    completed: int = 0
+    pending: int = 0
+
+class TaskCounts(TaskCountBreakdown):
+    by_priority: dict[str, TaskCountBreakdown] = {}
+
+class TaskSummary(TaskCounts):
+    user_id: Optional[int] = None
+
+class TaskBulkCreateResult(BaseModel):
+    created: int
+    ids: list[int]
+    created_at: datetime
+
+class TaskImportError(BaseModel):
+    row: int
+    error: str
+
+class TaskImportResult(BaseModel):
+    rows: int = 0
+    imported: int = 0
+    failed: int = 0
+    # Capped; `failed` counts every rejected row
+    errors: list[TaskImportError] = []
+    # Pass as `start_row` to resume after the last committed batch
+    next_row: int = 1
+
+class TaskFilter(BaseModel):
+    owner_id: Optional[int] = None
+    priority: Optional[str] = None
+    completed: Optional[bool] = None
+
+class TaskBulkDelete(BaseModel):
+    ids: Optional[list[int]] = None
+    filter: Optional[TaskFilter] = None
+
+class TaskBulkUpdate(TaskBulkDelete):
+    update: TaskUpdate
+
+class TaskBulkResult(BaseModel):
+    affected: int
+
 # User schemas
 class UserBase(BaseModel):
     email: EmailStr
@@ -48,4 +92,7 @@ class User(UserBase):
 
 class UserWithTasks(User):
     tasks: list[Task] = []
+    # Pass as `cursor` to GET /api/tasks/?user_id=... for the tasks after this page
+    next_tasks_cursor: Optional[str] = None
+    task_counts: Optional[TaskCounts] = None
 
@@ -0,0 +1,102 @@
+"""
+Password hashing
+
+bcrypt is deliberately CPU-heavy (~250ms at cost 12), so async callers hash
+and verify in a dedicated process pool instead of tying up the event loop,
+a threadpool worker or the GIL. The cost factor comes from BCRYPT_ROUNDS so
+tests and seeding can use cheap hashes while production keeps full rounds.
+"""
+import asyncio
+import os
+import threading
+import time
+from passlib.context import CryptContext
+from process_pool import process_pool
+
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))
+# 0 hashes on the default thread executor instead of a process pool
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+class HasherStats:
+    """Time jobs spent waiting for a hasher worker and running on it"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        with self._lock:
+            self.jobs = 0
+            self.queue_seconds_total = 0.0
+            self.queue_seconds_max = 0.0
+            self.run_seconds_total = 0.0
+    
+    def record(self, queue_seconds: float, run_seconds: float):
+        with self._lock:
+            self.jobs += 1
+            self.queue_seconds_total += queue_seconds
+            self.queue_seconds_max = max(self.queue_seconds_max, queue_seconds)
+            self.run_seconds_total += run_seconds
+    
+    def snapshot(self) -> dict:
+        with self._lock:
+            jobs = self.jobs
+            return {
+                "rounds": BCRYPT_ROUNDS,
+                "workers": PASSWORD_HASH_WORKERS,
+                "jobs": jobs,
+                "queue_wait_ms_total": round(self.queue_seconds_total * 1000, 2),
+                "queue_wait_ms_avg": round(self.queue_seconds_total * 1000 / jobs, 2) if jobs else 0.0,
+                "queue_wait_ms_max": round(self.queue_seconds_max * 1000, 2),
+                "run_ms_avg": round(self.run_seconds_total * 1000 / jobs, 2) if jobs else 0.0,
+            }
+
+hasher_stats = HasherStats()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor():
+    global _executor
+    if PASSWORD_HASH_WORKERS <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = process_pool(PASSWORD_HASH_WORKERS)
+        return _executor
+
+def _timed_call(func, submitted_at: float, *args):
+    # Runs in the worker; wall-clock time is comparable across processes
+    started_at = time.time()
+    result = func(*args)
+    return result, started_at - submitted_at, time.time() - started_at
+
+async def _run_in_hasher(func, *args):
+    loop = asyncio.get_running_loop()
+    result, queue_seconds, run_seconds = await loop.run_in_executor(
+        _get_executor(), _timed_call, func, time.time(), *args
+    )
+    hasher_stats.record(max(queue_seconds, 0.0), run_seconds)
+    return result
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_hasher(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hasher(verify_password, plain_password, hashed_password)
+
+def shutdown_hasher():
+    """Stop the hasher processes; a new pool is started on next use"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
@@ -1,6 +1,11 @@
 """
 Seed the database with demo data for presentation
 """
+import os
+
+# Demo accounts don't need production-cost hashes; set before security is imported
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
 from database import SessionLocal, init_db
 import crud
 import schemas
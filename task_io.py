@@ -0,0 +1,251 @@
+"""
+Streaming NDJSON and CSV encoding and decoding of tasks for exports and imports
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+import crud
+import schemas
+
+# Columns in the order GET /api/tasks/ serializes them
+TASK_FIELDS = tuple(schemas.Task.model_fields)
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _csv_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def ndjson_lines(rows: Iterable[Sequence]) -> str:
+    """One JSON object per row, keyed by TASK_FIELDS"""
+    return "".join(
+        json.dumps(dict(zip(TASK_FIELDS, row)), default=_json_default, separators=(",", ":")) + "\n"
+        for row in rows
+    )
+
+def csv_lines(rows: Iterable[Sequence], header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(TASK_FIELDS)
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+def encode_tasks(batches: Iterable[Sequence[Sequence]], format: str) -> Iterator[bytes]:
+    """Encode batches of task rows as they arrive, one chunk per batch"""
+    if format == "csv":
+        yield csv_lines((), header=True).encode()
+    for rows in batches:
+        text = csv_lines(rows) if format == "csv" else ndjson_lines(rows)
+        yield text.encode()
+
+# Rejected rows reported individually in an import result
+MAX_IMPORT_ERRORS = 100
+
+_task_list_adapter = TypeAdapter(List[schemas.TaskCreate])
+
+# Longest record accepted, in bytes; a longer row is reported and skipped
+MAX_RECORD_BYTES = 1024 * 1024
+
+class _RecordContinues(Exception):
+    """Raised into csv.reader when a record runs past the lines read so far"""
+
+def _lines_then_stop(lines: List[str]) -> Iterator[str]:
+    yield from lines
+    raise _RecordContinues
+
+async def _read_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[object]:
+    """Lines of an uploaded byte stream, without their newlines
+
+    Lines may straddle chunk boundaries. A line longer than MAX_RECORD_BYTES
+    is dropped, without buffering the rest of it, and a ValueError is
+    yielded in its place.
+    """
+    buffer = b""
+    oversized = False
+    first = True
+    async for chunk in chunks:
+        if first and chunk:
+            chunk = chunk.removeprefix(b"\xef\xbb\xbf")
+            first = False
+        lines = (buffer + chunk).split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            if oversized:
+                oversized = False
+                continue
+            yield line if len(line) <= MAX_RECORD_BYTES else ValueError(f"Record exceeds {MAX_RECORD_BYTES} bytes")
+        if len(buffer) > MAX_RECORD_BYTES:
+            if not oversized:
+                yield ValueError(f"Record exceeds {MAX_RECORD_BYTES} bytes")
+            oversized = True
+            buffer = b""
+    if buffer and not oversized:
+        yield buffer
+
+async def read_records(chunks: AsyncIterator[bytes], format: str) -> AsyncIterator[object]:
+    """Split an uploaded byte stream into NDJSON lines or parsed CSV records
+
+    Yields each NDJSON line as bytes and each CSV record as its list of
+    fields; a record csv.reader leaves open continues onto the next line.
+    A record that cannot be read, or grows past MAX_RECORD_BYTES, is yielded
+    as a ValueError so it is reported as that row's error. Blank lines
+    between records are skipped.
+    """
+    pending = []
+    pending_size = 0
+    async for line in _read_lines(chunks):
+        if format != "csv":
+            if isinstance(line, ValueError) or line.strip():
+                yield line
+            continue
+        if isinstance(line, ValueError):
+            pending, pending_size = [], 0
+            yield line
+            continue
+        if not pending and not line.strip():
+            continue
+        pending_size += len(line) + 1
+        if pending_size > MAX_RECORD_BYTES:
+            pending, pending_size = [], 0
+            yield ValueError(f"Record exceeds {MAX_RECORD_BYTES} bytes")
+            continue
+        try:
+            pending.append(line.decode() + "\n")
+            # Only a quote can close the quoted field an open record is in
+            if len(pending) > 1 and b'"' not in line:
+                continue
+            fields = next(csv.reader(_lines_then_stop(pending)))
+        except _RecordContinues:
+            continue
+        except (ValueError, csv.Error) as e:
+            fields = ValueError(str(e))
+        pending, pending_size = [], 0
+        yield fields
+    if pending:
+        # An unterminated quote runs to the end of the upload
+        try:
+            yield next(csv.reader(pending, strict=True))
+        except csv.Error as e:
+            yield ValueError(str(e))
+
+def _decode_batch(records: List[object], format: str, header: List[str]) -> List[object]:
+    """Field dicts for each record from read_records, or the ValueError explaining why it is unreadable"""
+    if format == "ndjson":
+        decoded = []
+        for record in records:
+            if isinstance(record, ValueError):
+                decoded.append(record)
+                continue
+            try:
+                values = json.loads(record)
+            except ValueError as e:
+                decoded.append(ValueError(f"Invalid JSON: {e}"))
+                continue
+            decoded.append(values if isinstance(values, dict) else ValueError("Expected a JSON object"))
+        return decoded
+    
+    decoded = []
+    for fields in records:
+        if isinstance(fields, ValueError):
+            decoded.append(fields)
+        elif len(fields) != len(header):
+            decoded.append(ValueError(f"Expected {len(header)} columns, got {len(fields)}"))
+        else:
+            # Empty cells fall back to the schema defaults
+            decoded.append({name: value for name, value in zip(header, fields) if value != ""})
+    return decoded
+
+def _validate_batch(batch: List[Tuple[int, object]], format: str, header: List[str],
+                    default_owner_id: int) -> Tuple[List[Tuple[int, int, schemas.TaskCreate]], Dict[int, str]]:
+    """Validate a batch against TaskCreate in one pass, collecting per-row errors"""
+    errors = {}
+    candidates = []
+    for (row, _), values in zip(batch, _decode_batch([record for _, record in batch], format, header)):
+        if isinstance(values, ValueError):
+            errors[row] = str(values)
+            continue
+        owner_id = values.pop("owner_id", None) or default_owner_id
+        try:
+            owner_id = int(owner_id)
+        except (TypeError, ValueError):
+            errors[row] = "owner_id: required integer, or pass user_id"
+            continue
+        candidates.append((row, owner_id, values))
+    
+    try:
+        tasks = _task_list_adapter.validate_python([values for _, _, values in candidates])
+    except ValidationError as e:
+        invalid = {}
+        for error in e.errors():
+            field = ".".join(str(part) for part in error["loc"][1:])
+            invalid.setdefault(error["loc"][0], f"{field}: {error['msg']}" if field else error["msg"])
+        for index, message in invalid.items():
+            errors[candidates[index][0]] = message
+        candidates = [candidate for index, candidate in enumerate(candidates) if index not in invalid]
+        tasks = _task_list_adapter.validate_python([values for _, _, values in candidates])
+    return [(row, owner_id, task) for (row, owner_id, _), task in zip(candidates, tasks)], errors
+
+async def import_tasks(db: Session, chunks: AsyncIterator[bytes], format: str, user_id: int = None,
+                       start_row: int = 1, batch_size: int = 1000) -> schemas.TaskImportResult:
+    """Validate and insert uploaded tasks one batch and one transaction at a time
+
+    Rows are numbered from 1, not counting the CSV header. Rows before
+    start_row are skipped, so a failed import can be resumed from next_row.
+    The body is awaited as it arrives and each batch's queries run on the
+    threadpool.
+    """
+    result = schemas.TaskImportResult(next_row=start_row)
+    header = None
+    batch = []
+    
+    async def flush():
+        valid, errors = _validate_batch(batch, format, header, user_id)
+        known_owners = await run_in_threadpool(crud.get_existing_user_ids, db, {owner_id for _, owner_id, _ in valid})
+        for row, owner_id, _ in valid:
+            if owner_id not in known_owners:
+                errors[row] = f"owner_id: user {owner_id} not found"
+        result.imported += await run_in_threadpool(
+            crud.import_tasks, db, [(owner_id, task) for row, owner_id, task in valid if row not in errors]
+        )
+        result.rows += len(batch)
+        result.failed += len(errors)
+        for row in sorted(errors)[:MAX_IMPORT_ERRORS - len(result.errors)]:
+            result.errors.append(schemas.TaskImportError(row=row, error=errors[row]))
+        result.next_row = batch[-1][0] + 1
+        batch.clear()
+    
+    row = 0
+    async for record in read_records(chunks, format):
+        if format == "csv" and header is None:
+            if isinstance(record, ValueError):
+                raise ValueError(f"Header: {record}")
+            header = record
+            continue
+        row += 1
+        if row < start_row:
+            continue
+        batch.append((row, record))
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+    return result
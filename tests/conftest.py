@@ -0,0 +1,11 @@
+"""
+Shared test configuration
+"""
+import os
+import tempfile
+
+# Cheap bcrypt hashes keep user-creating tests fast; must be set before security is imported
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+# Importing main creates the app's database; keep it out of the working tree
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='task_api_'), 'app.db')}")
@@ -1,40 +1,53 @@
 """
 Integration tests for API endpoints
 """
+import csv
+import io
+import json
+import logging
 import pytest
+from fastapi import Request
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from cache import response_cache
+import crud
 from database import Base, get_db
+import main
+import task_io
 from main import app
-
-# Test database
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test_api.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-app.dependency_overrides[get_db] = override_get_db
+from pagination import encode_cursor
 
 @pytest.fixture
-def client():
+def client(tmp_path):
     """Create test client with fresh database"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test_api.db'}", connect_args={"check_same_thread": False})
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    
+    def override_get_db():
+        try:
+            db = TestingSessionLocal()
+            yield db
+        finally:
+            db.close()
+    
+    app.dependency_overrides[get_db] = override_get_db
     Base.metadata.create_all(bind=engine)
+    response_cache.clear()
     client = TestClient(app)
     yield client
-    Base.metadata.drop_all(bind=engine)
+    app.dependency_overrides.clear()
+    engine.dispose()
 
 def test_health_check(client):
     """Test health check endpoint"""
     response = client.get("/api/health")
     assert response.status_code == 200
-    assert response.json() == {"status": "healthy", "environment": "staging"}
+    data = response.json()
+    assert data["status"] == "healthy"
+    assert data["environment"] == "staging"
+    assert data["database"]["profile"] == "tuned"
+    assert data["database"]["pragmas"]["journal_mode"] == "WAL"
 
 def test_create_user_success(client):
     """Test successful user creation"""
@@ -249,3 +262,384 @@ def test_completed_stats(client):
     assert stats["user_id"] == user_id
 
 
+def test_get_tasks_cursor_pagination(client):
+    """Test walking all tasks with the keyset cursor"""
+    user_response = client.post(
+        "/api/users/",
+        json={"email": "cursor@test.com", "username": "cursor", "password": "pass"}
+    )
+    user_id = user_response.json()["id"]
+    for i in range(5):
+        client.post(f"/api/users/{user_id}/tasks/", json={"title": f"Task {i}"})
+    
+    seen = []
+    response = client.get("/api/tasks/?limit=2")
+    while True:
+        assert response.status_code == 200
+        seen.extend(task["title"] for task in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        response = client.get("/api/tasks/", params={"limit": 2, "cursor": cursor})
+    
+    assert seen == [f"Task {i}" for i in range(5)]
+
+def test_get_tasks_invalid_cursor(client):
+    """Test that a malformed cursor is rejected"""
+    response = client.get("/api/tasks/?cursor=not-a-cursor")
+    assert response.status_code == 400
+    assert "Invalid cursor" in response.json()["detail"]
+
+def test_create_tasks_bulk(client):
+    """Test creating many tasks in one request"""
+    user_response = client.post(
+        "/api/users/",
+        json={"email": "bulk@test.com", "username": "bulk", "password": "pass"}
+    )
+    user_id = user_response.json()["id"]
+    
+    response = client.post(
+        f"/api/users/{user_id}/tasks/bulk",
+        json=[{"title": f"Bulk {i}", "priority": "high"} for i in range(3)]
+    )
+    assert response.status_code == 201
+    data = response.json()
+    assert data["created"] == 3
+    assert len(data["ids"]) == 3
+    
+    tasks = client.get(f"/api/tasks/?user_id={user_id}").json()
+    assert [task["id"] for task in tasks] == data["ids"]
+
+def test_create_tasks_bulk_unknown_user(client):
+    """Test that bulk creation for a missing user is rejected"""
+    response = client.post("/api/users/9999/tasks/bulk", json=[{"title": "Orphan"}])
+    assert response.status_code == 404
+
+def test_bulk_update_and_delete_tasks(client):
+    """Test bulk PATCH and DELETE endpoints"""
+    user_response = client.post(
+        "/api/users/",
+        json={"email": "bulkedit@test.com", "username": "bulkedit", "password": "pass"}
+    )
+    user_id = user_response.json()["id"]
+    ids = client.post(
+        f"/api/users/{user_id}/tasks/bulk",
+        json=[{"title": f"Task {i}"} for i in range(4)]
+    ).json()["ids"]
+    
+    response = client.patch(
+        "/api/tasks/bulk",
+        json={"filter": {"owner_id": user_id}, "update": {"completed": True}}
+    )
+    assert response.status_code == 200
+    assert response.json() == {"affected": 4}
+    stats = client.get(f"/api/stats/completed?user_id={user_id}").json()
+    assert stats["completed_tasks"] == 4
+    
+    response = client.request("DELETE", "/api/tasks/bulk", json={"ids": ids[:3]})
+    assert response.status_code == 200
+    assert response.json() == {"affected": 3}
+    assert len(client.get(f"/api/tasks/?user_id={user_id}").json()) == 1
+
+def test_bulk_delete_requires_selection(client):
+    """Test that a bulk delete without ids or filter is rejected"""
+    response = client.request("DELETE", "/api/tasks/bulk", json={"filter": {}})
+    assert response.status_code == 400
+
+def test_get_user_tasks_page_and_summary(client):
+    """Test that user tasks are capped with a cursor and can be summarised"""
+    user_response = client.post(
+        "/api/users/",
+        json={"email": "power@test.com", "username": "power", "password": "pass"}
+    )
+    user_id = user_response.json()["id"]
+    client.post(
+        f"/api/users/{user_id}/tasks/bulk",
+        json=[{"title": f"Task {i}", "priority": "high" if i < 2 else "low", "completed": i == 0}
+              for i in range(5)]
+    )
+    
+    data = client.get(f"/api/users/{user_id}?tasks_limit=3").json()
+    assert [task["title"] for task in data["tasks"]] == ["Task 0", "Task 1", "Task 2"]
+    rest = client.get(
+        "/api/tasks/", params={"user_id": user_id, "cursor": data["next_tasks_cursor"]}
+    ).json()
+    assert [task["title"] for task in rest] == ["Task 3", "Task 4"]
+    # An empty page would carry no cursor to the rest; summary=true is the no-tasks view
+    assert client.get(f"/api/users/{user_id}?tasks_limit=0").status_code == 422
+    
+    data = client.get(f"/api/users/{user_id}?summary=true").json()
+    assert data["tasks"] == []
+    counts = data["task_counts"]
+    assert (counts["total"], counts["completed"], counts["pending"]) == (5, 1, 4)
+    assert counts["by_priority"]["high"] == {"total": 2, "completed": 1, "pending": 1}
+    assert counts["by_priority"]["low"] == {"total": 3, "completed": 0, "pending": 3}
+
+def test_read_cache_invalidated_by_writes(client):
+    """Test that cached reads are served until a write to the same owner"""
+    user_response = client.post(
+        "/api/users/",
+        json={"email": "cached@test.com", "username": "cached", "password": "pass"}
+    )
+    user_id = user_response.json()["id"]
+    task_id = client.post(f"/api/users/{user_id}/tasks/", json={"title": "Cached"}).json()["id"]
+    
+    assert len(client.get(f"/api/tasks/?user_id={user_id}").json()) == 1
+    client.get(f"/api/tasks/{task_id}")
+    hits = response_cache.stats()["hits"]
+    assert len(client.get(f"/api/tasks/?user_id={user_id}").json()) == 1
+    assert client.get(f"/api/tasks/{task_id}").json()["title"] == "Cached"
+    assert response_cache.stats()["hits"] == hits + 2
+    
+    client.patch(f"/api/tasks/{task_id}", json={"title": "Renamed"})
+    assert client.get(f"/api/tasks/{task_id}").json()["title"] == "Renamed"
+    
+    client.post(f"/api/users/{user_id}/tasks/", json={"title": "Second"})
+    assert len(client.get(f"/api/tasks/?user_id={user_id}").json()) == 2
+    assert len(client.get("/api/tasks/").json()) == 2
+    
+    client.delete(f"/api/tasks/{task_id}")
+    assert len(client.get(f"/api/tasks/?user_id={user_id}").json()) == 1
+
+def test_conditional_get_and_if_match(client):
+    """Test ETag revalidation on reads and lost-update protection on PATCH"""
+    user_response = client.post(
+        "/api/users/",
+        json={"email": "etag@test.com", "username": "etag", "password": "pass"}
+    )
+    user_id = user_response.json()["id"]
+    task_id = client.post(f"/api/users/{user_id}/tasks/", json={"title": "Versioned"}).json()["id"]
+    
+    for url in (f"/api/tasks/{task_id}", f"/api/tasks/?user_id={user_id}", f"/api/users/{user_id}"):
+        response = client.get(url)
+        etag = response.headers["ETag"]
+        not_modified = client.get(url, headers={"If-None-Match": etag})
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+        assert not_modified.headers["ETag"] == etag
+    
+    etag = client.get(f"/api/tasks/{task_id}").headers["ETag"]
+    response = client.patch(f"/api/tasks/{task_id}", json={"completed": True}, headers={"If-Match": etag})
+    assert response.status_code == 200
+    new_etag = response.headers["ETag"]
+    assert new_etag != etag
+    
+    assert client.get(f"/api/tasks/{task_id}", headers={"If-None-Match": etag}).status_code == 200
+    response = client.patch(f"/api/tasks/{task_id}", json={"title": "Stale"}, headers={"If-Match": etag})
+    assert response.status_code == 412
+    assert client.get(f"/api/tasks/{task_id}").json()["title"] == "Versioned"
+    
+    # An empty update writes nothing, so the task keeps its ETag
+    response = client.patch(f"/api/tasks/{task_id}", json={}, headers={"If-Match": new_etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == new_etag
+    assert client.patch(f"/api/tasks/{task_id}", json={}, headers={"If-Match": etag}).status_code == 412
+
+def test_if_match_rejects_write_between_check_and_update(client, monkeypatch):
+    """Test that of two PATCHes holding the same ETag, the one that writes second gets 412"""
+    user_response = client.post(
+        "/api/users/",
+        json={"email": "race@test.com", "username": "race", "password": "pass"}
+    )
+    user_id = user_response.json()["id"]
+    task_id = client.post(f"/api/users/{user_id}/tasks/", json={"title": "Contended"}).json()["id"]
+    etag = client.get(f"/api/tasks/{task_id}").headers["ETag"]
+    update_task = crud.update_task
+
+    def update_after_competing_patch(db, **kwargs):
+        # The competing PATCH passed its If-Match check with the same ETag and commits first
+        monkeypatch.setattr(crud, "update_task", update_task)
+        response = client.patch(f"/api/tasks/{task_id}", json={"title": "First"}, headers={"If-Match": etag})
+        assert response.status_code == 200
+        return update_task(db, **kwargs)
+
+    monkeypatch.setattr(crud, "update_task", update_after_competing_patch)
+    response = client.patch(f"/api/tasks/{task_id}", json={"title": "Second"}, headers={"If-Match": etag})
+    assert response.status_code == 412
+    assert client.get(f"/api/tasks/{task_id}").json()["title"] == "First"
+
+def test_summary_stats(client):
+    """Test the counter-backed summary for one user and for everyone"""
+    users = []
+    for name in ("summary1", "summary2"):
+        response = client.post(
+            "/api/users/",
+            json={"email": f"{name}@test.com", "username": name, "password": "pass"}
+        )
+        users.append(response.json()["id"])
+    client.post(f"/api/users/{users[0]}/tasks/", json={"title": "A", "priority": "high", "completed": True})
+    client.post(f"/api/users/{users[0]}/tasks/", json={"title": "B", "priority": "low"})
+    client.post(f"/api/users/{users[1]}/tasks/", json={"title": "C", "priority": "high"})
+    
+    summary = client.get(f"/api/stats/summary?user_id={users[0]}").json()
+    assert summary["user_id"] == users[0]
+    assert (summary["total"], summary["completed"], summary["pending"]) == (2, 1, 1)
+    
+    summary = client.get("/api/stats/summary").json()
+    assert summary["user_id"] is None
+    assert summary["total"] == 3
+    assert summary["by_priority"]["high"] == {"total": 2, "completed": 1, "pending": 1}
+
+def test_search_tasks(client):
+    """Test full-text search with cursor pagination and cache invalidation"""
+    response = client.post(
+        "/api/users/",
+        json={"email": "searcher@test.com", "username": "searcher", "password": "pass"}
+    )
+    user_id = response.json()["id"]
+    for i in range(3):
+        client.post(f"/api/users/{user_id}/tasks/", json={"title": f"Invoice {i}", "description": "Send it"})
+    
+    response = client.get(f"/api/tasks/search?q=invoice&user_id={user_id}&limit=2")
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    cursor = response.headers["X-Next-Cursor"]
+    
+    response = client.get(f"/api/tasks/search?q=invoice&user_id={user_id}&limit=2&cursor={cursor}")
+    assert len(response.json()) == 1
+    assert "X-Next-Cursor" not in response.headers
+    
+    client.post(f"/api/users/{user_id}/tasks/", json={"title": "Invoice 3"})
+    assert len(client.get(f"/api/tasks/search?q=invoice&user_id={user_id}").json()) == 4
+    
+    assert client.get("/api/tasks/search?q=invoice&cursor=bogus").status_code == 400
+    for values in ({"score": True, "id": 1}, {"score": -1.5, "id": False}, {"score": "1", "id": 1}):
+        response = client.get("/api/tasks/search", params={"q": "invoice", "cursor": encode_cursor(values)})
+        assert response.status_code == 400
+    assert client.get("/api/tasks/search").status_code == 422
+
+def test_export_tasks(client):
+    """Test NDJSON and CSV exports with filters"""
+    response = client.post(
+        "/api/users/",
+        json={"email": "exporter@test.com", "username": "exporter", "password": "pass"}
+    )
+    user_id = response.json()["id"]
+    client.post(f"/api/users/{user_id}/tasks/bulk", json=[
+        {"title": f"Export {i}", "priority": "high" if i % 2 else "low", "completed": i == 1}
+        for i in range(4)
+    ])
+    
+    response = client.get(f"/api/tasks/export?user_id={user_id}")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["title"] for row in rows] == [f"Export {i}" for i in range(4)]
+    assert rows == client.get(f"/api/tasks/?user_id={user_id}").json()
+    
+    response = client.get(f"/api/tasks/export?format=csv&user_id={user_id}&priority=high&completed=false")
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["title"] for row in rows] == ["Export 3"]
+    assert rows[0]["completed"] == "false"
+    
+    assert client.get("/api/tasks/export?format=xml").status_code == 422
+    assert client.get("/api/tasks/export?priority=urgent").status_code == 400
+
+def test_import_tasks(client):
+    """Test NDJSON and CSV imports with per-row errors and resuming"""
+    response = client.post(
+        "/api/users/",
+        json={"email": "importer@test.com", "username": "importer", "password": "pass"}
+    )
+    user_id = response.json()["id"]
+    lines = [
+        json.dumps({"title": "First", "priority": "high"}),
+        "{not json",
+        json.dumps({"description": "No title"}),
+        "",
+        json.dumps({"title": "Elsewhere", "owner_id": 9999}),
+        json.dumps({"title": "Last", "completed": True}),
+    ]
+    response = client.post(
+        f"/api/tasks/import?user_id={user_id}&batch_size=2", content="\n".join(lines).encode()
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["rows"], result["imported"], result["failed"], result["next_row"]) == (5, 2, 3, 6)
+    assert [error["row"] for error in result["errors"]] == [2, 3, 4]
+    assert result["errors"][1]["error"].startswith("title")
+    
+    response = client.post(
+        f"/api/tasks/import?user_id={user_id}&start_row=5", content="\n".join(lines).encode()
+    )
+    assert response.json()["imported"] == 1
+    
+    exported = client.get(f"/api/tasks/export?format=csv&user_id={user_id}").content
+    body = exported + b'"Multi\nline",,false,low,,,,\n'
+    response = client.post(f"/api/tasks/import?format=csv&user_id={user_id}", content=body)
+    assert response.json()["imported"] == 4
+    
+    summary = client.get(f"/api/stats/summary?user_id={user_id}").json()
+    assert (summary["total"], summary["completed"]) == (7, 4)
+    titles = [task["title"] for task in client.get(f"/api/tasks/?user_id={user_id}").json()]
+    assert titles == ["First", "Last", "Last", "First", "Last", "Last", "Multi\nline"]
+
+def test_import_csv_stray_quotes(client, monkeypatch):
+    """Test that a quote inside a field or an unclosed one only fails its own row"""
+    monkeypatch.setattr(task_io, "MAX_RECORD_BYTES", 200)
+    response = client.post(
+        "/api/users/",
+        json={"email": "quotes@test.com", "username": "quotes", "password": "pass"}
+    )
+    user_id = response.json()["id"]
+    rows = [f"Task {i},desc {i}" for i in range(1, 7)]
+    rows[1] = 'Fix 5" pipe,desc'
+    body = "title,description\n" + "\n".join(rows) + "\n"
+    response = client.post(f"/api/tasks/import?format=csv&user_id={user_id}", content=body.encode())
+    result = response.json()
+    assert (result["rows"], result["imported"], result["failed"], result["next_row"]) == (6, 6, 0, 7)
+    titles = [task["title"] for task in client.get(f"/api/tasks/?user_id={user_id}").json()]
+    assert titles[1] == 'Fix 5" pipe'
+    
+    rows[3] = '"Never closed,desc'
+    body = "title,description\n" + "\n".join(rows + ["x" * 150] * 3) + "\n"
+    response = client.post(f"/api/tasks/import?format=csv&user_id={user_id}", content=body.encode())
+    result = response.json()
+    assert (result["rows"], result["imported"], result["failed"], result["next_row"]) == (5, 3, 2, 6)
+    assert result["errors"][0] == {"row": 4, "error": "Record exceeds 200 bytes"}
+
+def test_request_id_header(client):
+    """Test that request ids are echoed, or generated when absent"""
+    response = client.get("/api/health", headers={"X-Request-ID": "trace-42"})
+    assert response.headers["X-Request-ID"] == "trace-42"
+    
+    generated = client.get("/api/health").headers["X-Request-ID"]
+    assert len(generated) == 32
+
+def test_one_log_record_per_request(client, caplog):
+    """Test that each request is logged once, with its route template and weight"""
+    caplog.set_level(logging.INFO, logger="main")
+    client.get("/api/tasks/12345")
+    
+    records = [record for record in caplog.records if record.name == "main"]
+    assert len(records) == 1
+    assert records[0].route == "/api/tasks/{task_id}"
+    assert (records[0].status_code, records[0].sample_weight) == (404, 1)
+
+def test_metrics_endpoint(client, caplog):
+    """Test that /metrics reports route templates and is not itself logged"""
+    client.get("/api/tasks/424242")
+    client.get("/api/tasks/434343")
+    caplog.set_level(logging.INFO, logger="main")
+    caplog.clear()
+    
+    response = client.get("/metrics")
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_requests_total{method="GET",route="/api/tasks/{task_id}",status="404"}' in response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/tasks/{task_id}"}' in response.text
+    assert "threadpool_threads_max" in response.text
+    assert "/metrics" not in response.text
+    assert not [record for record in caplog.records if record.name == "main"]
+
+def test_route_template_prefers_full_match():
+    """Test that a route matching only by path does not shadow the route that serves the request"""
+    def template(method, path):
+        return main.route_template(Request({"type": "http", "method": method, "path": path, "app": app}))
+    
+    assert template("GET", "/api/tasks/bulk") == "/api/tasks/{task_id}"
+    assert template("PATCH", "/api/tasks/bulk") == "/api/tasks/bulk"
+    assert template("PUT", "/api/tasks/7") == "/api/tasks/{task_id}"
+    assert template("GET", "/api/nowhere") == "unmatched"
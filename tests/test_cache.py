@@ -0,0 +1,62 @@
+"""
+Unit tests for the response cache
+"""
+from cache import ResponseCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_lru_eviction_by_entry_count():
+    """Test that the least recently used entry is evicted first"""
+    cache = ResponseCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    cache.get("a")
+    cache.set("c", b"3")
+    
+    assert cache.get("b") is None
+    assert cache.get("a").body == b"1"
+    assert cache.get("c").body == b"3"
+    assert cache.stats()["evictions"] == 1
+
+def test_byte_cap_accounting():
+    """Test that stored bytes never exceed the cap"""
+    cache = ResponseCache(max_entries=100, max_bytes=2000, ttl_seconds=60)
+    for i in range(10):
+        cache.set(f"key{i}", b"x" * 500)
+        assert cache.stats()["bytes"] <= 2000
+    assert cache.get("key9") is not None
+    assert cache.get("key0") is None
+    
+    cache.set("huge", b"x" * 5000)
+    assert cache.get("huge") is None
+
+def test_ttl_expiry():
+    """Test that entries expire after the TTL"""
+    clock = FakeClock()
+    cache = ResponseCache(ttl_seconds=5, clock=clock)
+    cache.set("a", b"1")
+    clock.now = 4.9
+    assert cache.get("a") is not None
+    clock.now = 5.0
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+def test_tag_invalidation_and_racing_fills():
+    """Test that invalidation drops tagged entries and voids in-flight fills"""
+    cache = ResponseCache(ttl_seconds=60)
+    cache.set("owner1", b"1", tags=["owner:1"])
+    cache.set("owner2", b"2", tags=["owner:2"])
+    
+    token = cache.fill_token()
+    cache.invalidate("owner:1")
+    assert cache.get("owner1") is None
+    assert cache.get("owner2") is not None
+    
+    cache.set("stale", b"old", tags=["owner:1"], token=token)
+    assert cache.get("stale") is None
+    assert cache.stats()["entries"] == 1
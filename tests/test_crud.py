@@ -2,28 +2,24 @@
 Unit tests for CRUD operations
 """
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, delete, func, select, update
 from sqlalchemy.orm import sessionmaker
 from database import Base
 import crud
 import schemas
 import models
 
-# Test database
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
 @pytest.fixture
-def db():
+def db(tmp_path):
     """Create a fresh database for each test"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
     Base.metadata.create_all(bind=engine)
-    db = TestingSessionLocal()
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
     try:
         yield db
     finally:
         db.close()
-        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
 
 def test_create_user(db):
     """Test creating a user"""
@@ -184,3 +180,130 @@ def test_completed_tasks_count(db):
     assert count == 2
 
 
+
+def test_get_tasks_keyset_pagination(db):
+    """Test seeking past a cursor id returns the following page"""
+    user = crud.create_user(db, schemas.UserCreate(
+        email="pager@example.com", username="pager", password="pass"
+    ))
+    tasks = [crud.create_task(db, schemas.TaskCreate(title=f"Task{i}"), user.id) for i in range(5)]
+    
+    first_page = crud.get_tasks(db, limit=2, user_id=user.id)
+    assert [t.id for t in first_page] == [tasks[0].id, tasks[1].id]
+    
+    next_page = crud.get_tasks(db, limit=2, user_id=user.id, after_id=first_page[-1].id)
+    assert [t.id for t in next_page] == [tasks[2].id, tasks[3].id]
+    
+    last_page = crud.get_tasks(db, limit=2, user_id=user.id, after_id=next_page[-1].id)
+    assert [t.id for t in last_page] == [tasks[4].id]
+
+def test_create_tasks_bulk(db):
+    """Test inserting many tasks at once"""
+    user = crud.create_user(db, schemas.UserCreate(
+        email="bulk@example.com", username="bulker", password="pass"
+    ))
+    
+    ids, created_at = crud.create_tasks_bulk(db, [
+        schemas.TaskCreate(title=f"Bulk{i}", priority="high" if i % 2 else "low")
+        for i in range(10)
+    ], user.id)
+    
+    assert len(ids) == 10
+    tasks = crud.get_tasks(db, user_id=user.id)
+    assert [t.id for t in tasks] == ids
+    assert [t.title for t in tasks] == [f"Bulk{i}" for i in range(10)]
+    assert all(t.created_at == created_at and t.updated_at == created_at for t in tasks)
+
+def test_bulk_update_and_delete_tasks(db):
+    """Test set-based updates and deletes by filter and id list"""
+    user = crud.create_user(db, schemas.UserCreate(
+        email="bulkedit@example.com", username="bulkeditor", password="pass"
+    ))
+    ids, created_at = crud.create_tasks_bulk(db, [
+        schemas.TaskCreate(title=f"Task{i}", priority="high" if i < 3 else "low")
+        for i in range(5)
+    ], user.id)
+    
+    affected = crud.bulk_update_tasks(
+        db, schemas.TaskUpdate(completed=True),
+        task_filter=schemas.TaskFilter(owner_id=user.id, priority="high")
+    )
+    assert affected == 3
+    high_tasks = crud.get_tasks_by_priority(db, "high", user_id=user.id)
+    assert all(task.completed for task in high_tasks)
+    assert all(task.updated_at > created_at for task in high_tasks)
+    
+    affected = crud.bulk_delete_tasks(db, ids=ids[:2])
+    assert affected == 2
+    assert [t.id for t in crud.get_tasks(db, user_id=user.id)] == ids[2:]
+
+def test_task_counters_follow_writes(db):
+    """Test that counters track every write path and match a rebuild"""
+    user = crud.create_user(db, schemas.UserCreate(
+        email="counted@example.com", username="counted", password="pass"
+    ))
+    task = crud.create_task(db, schemas.TaskCreate(title="Single", priority="high"), user.id)
+    ids, _ = crud.create_tasks_bulk(db, [
+        schemas.TaskCreate(title=f"Bulk{i}", priority="low") for i in range(4)
+    ], user.id)
+    crud.update_task(db, task.id, schemas.TaskUpdate(completed=True))
+    crud.bulk_update_tasks(db, schemas.TaskUpdate(priority="medium", completed=True), ids=ids[:2])
+    crud.bulk_delete_tasks(db, task_filter=schemas.TaskFilter(owner_id=user.id, priority="low"))
+    crud.delete_task(db, ids[0])
+    
+    counts = crud.get_task_counts(db, user_id=user.id)
+    assert (counts.total, counts.completed, counts.pending) == (2, 2, 0)
+    assert counts.by_priority["high"].completed == 1
+    assert counts.by_priority["medium"].completed == 1
+    assert "low" not in counts.by_priority
+    assert crud.get_completed_tasks_count(db, user_id=user.id) == 2
+    
+    crud.rebuild_task_counters(db)
+    db.commit()
+    assert crud.get_task_counts(db, user_id=user.id) == counts
+
+def test_task_counters_follow_statements_outside_crud(db):
+    """Test that counters are kept by the database, so writes not made through crud.py are counted too"""
+    user = crud.create_user(db, schemas.UserCreate(
+        email="direct@example.com", username="direct", password="pass"
+    ))
+    ids, _ = crud.create_tasks_bulk(db, [
+        schemas.TaskCreate(title=f"Direct{i}", priority=("low", "high")[i % 2]) for i in range(6)
+    ], user.id)
+    db.execute(update(models.Task).where(models.Task.priority == "low").values(completed=True))
+    db.execute(update(models.Task).where(models.Task.id == ids[1]).values(owner_id=None))
+    db.execute(delete(models.Task).where(models.Task.id == ids[2]))
+    db.commit()
+    
+    counts = crud.get_task_counts(db, user_id=user.id)
+    assert counts.total == db.scalar(select(func.count()).where(models.Task.owner_id == user.id))
+    assert (counts.total, counts.completed) == (4, 2)
+    assert counts.by_priority["high"].pending == 2
+
+def test_search_tasks(db):
+    """Test that search follows writes, ranks title matches first and pages"""
+    user = crud.create_user(db, schemas.UserCreate(
+        email="search@example.com", username="search", password="pass"
+    ))
+    other = crud.create_user(db, schemas.UserCreate(
+        email="other@example.com", username="other", password="pass"
+    ))
+    in_description = crud.create_task(db, schemas.TaskCreate(title="Notes", description="Deploy the API"), user.id)
+    in_title = crud.create_task(db, schemas.TaskCreate(title="Deploy frontend"), user.id)
+    crud.create_task(db, schemas.TaskCreate(title="Deploy docs"), other.id)
+    crud.create_task(db, schemas.TaskCreate(title="Unrelated"), user.id)
+    
+    results = crud.search_tasks(db, "deploying", user_id=user.id)
+    assert [task.id for task, _ in results] == [in_title.id, in_description.id]
+    assert len(crud.search_tasks(db, "deploy")) == 3
+    assert len(crud.search_tasks(db, 'deploy" (*')) == 3
+    assert crud.search_tasks(db, "  ") == []
+    
+    first = crud.search_tasks(db, "deploy", user_id=user.id, limit=1)
+    second = crud.search_tasks(db, "deploy", user_id=user.id, limit=1, after=(first[0][1], first[0][0].id))
+    assert [task.id for task, _ in first + second] == [in_title.id, in_description.id]
+    
+    crud.update_task(db, in_title.id, schemas.TaskUpdate(title="Release frontend"))
+    crud.delete_task(db, in_description.id)
+    assert crud.search_tasks(db, "deploy", user_id=user.id) == []
+    assert [task.id for task, _ in crud.search_tasks(db, "release")] == [in_title.id]
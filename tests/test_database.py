@@ -0,0 +1,32 @@
+"""
+Tests for the SQLite engine profile
+"""
+import pytest
+from sqlalchemy import create_engine, event
+import database
+
+def test_sqlite_pragma_overrides():
+    """Test that environment variables select a profile and override pragmas"""
+    profile, pragmas = database.get_sqlite_pragmas({"DB_PROFILE": "tuned", "SQLITE_SYNCHRONOUS": "FULL"})
+    assert profile == "tuned"
+    assert pragmas["synchronous"] == "FULL"
+    assert pragmas["journal_mode"] == "WAL"
+    
+    profile, pragmas = database.get_sqlite_pragmas({"DB_PROFILE": "default"})
+    assert pragmas == {}
+
+def test_sqlite_pragma_rejects_bad_values():
+    """Test that unknown profiles and unsafe values are refused"""
+    with pytest.raises(ValueError):
+        database.get_sqlite_pragmas({"DB_PROFILE": "turbo"})
+    with pytest.raises(ValueError):
+        database.get_sqlite_pragmas({"SQLITE_CACHE_SIZE": "1; DROP TABLE tasks"})
+
+def test_connect_hook_applies_pragmas(tmp_path):
+    """Test that new connections run in WAL mode with the tuned settings"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+    event.listen(engine, "connect", database.apply_sqlite_pragmas)
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar().upper() == "WAL"
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+    engine.dispose()
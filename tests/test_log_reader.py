@@ -0,0 +1,152 @@
+"""
+Unit tests for log file reading in the log analytics server
+"""
+import gzip
+import json
+from datetime import datetime, timedelta
+
+import log_reader
+
+START = datetime(2024, 1, 1, 12, 0, 0)
+
+def write_log(path, count: int, start: datetime = START, step: timedelta = timedelta(seconds=1)):
+    with open(path, "w") as f:
+        for i in range(count):
+            timestamp = (start + step * i).isoformat(timespec="milliseconds")
+            f.write(json.dumps({"timestamp": timestamp, "level": "INFO", "message": f"entry {i}"}) + "\n")
+
+def test_iter_lines_reverse_across_blocks(tmp_path):
+    """Test that lines straddling block boundaries come back whole and in reverse"""
+    path = tmp_path / "app.log"
+    lines = [f"line {i} " + "x" * (i % 7) for i in range(200)]
+    path.write_text("\n".join(lines) + "\n")
+    
+    assert [line.decode() for line in log_reader.iter_lines_reverse(path, block_size=16)] == lines[::-1]
+
+def test_read_recent_stops_at_max_lines(tmp_path):
+    """Test that only the newest entries are returned, oldest first"""
+    path = tmp_path / "app.log"
+    write_log(path, 100)
+    with open(path, "a") as f:
+        f.write("not json\n")
+    
+    entries = log_reader.read_recent(path, max_lines=3)
+    
+    assert [entry["message"] for entry in entries] == ["entry 97", "entry 98", "entry 99"]
+
+def test_read_recent_stops_at_time_cutoff(tmp_path):
+    """Test that reading stops at the first entry outside the window"""
+    path = tmp_path / "app.log"
+    write_log(path, 600)
+    
+    entries = log_reader.read_recent(path, since=START + timedelta(seconds=589))
+    
+    assert [entry["message"] for entry in entries] == [f"entry {i}" for i in range(590, 600)]
+    assert log_reader.read_recent(tmp_path / "missing.log") == []
+
+def test_time_index_extends_incrementally(tmp_path):
+    """Test that a refresh only indexes appended bytes and offsets land on line starts"""
+    path = tmp_path / "app.log"
+    write_log(path, 500)
+    index = log_reader.TimeIndex(path, interval=1024).refresh()
+    indexed_size = index.size
+    write_log(tmp_path / "more.log", 500, start=START + timedelta(seconds=500))
+    with open(path, "a") as f:
+        f.write((tmp_path / "more.log").read_text() + '{"timestamp": "2024-01-01T12:')
+    
+    reloaded = log_reader.TimeIndex(path, interval=1024)
+    reloaded._load()
+    assert reloaded.size == indexed_size
+    reloaded.refresh()
+    
+    data = path.read_bytes()
+    assert reloaded.size == data.rindex(b"\n") + 1
+    assert len(reloaded.offsets) > len(index.offsets)
+    assert reloaded.offsets[:len(index.offsets)] == index.offsets
+    for timestamp, offset in zip(reloaded.timestamps, reloaded.offsets):
+        assert offset == 0 or data[offset - 1:offset] == b"\n"
+        entry = log_reader.parse_line(data[offset:data.index(b"\n", offset)])
+        assert entry["timestamp"] == timestamp.isoformat(timespec="milliseconds")
+
+def test_time_index_rebuilds_after_rotation(tmp_path):
+    """Test that a recreated file with a new inode is indexed from scratch"""
+    path = tmp_path / "app.log"
+    write_log(path, 500)
+    log_reader.TimeIndex(path, interval=1024).refresh()
+    path.rename(tmp_path / "app.log.1")
+    write_log(path, 50, start=START + timedelta(hours=1))
+    
+    index = log_reader.TimeIndex(path, interval=1024).refresh()
+    
+    assert index.inode == path.stat().st_ino
+    assert index.size == path.stat().st_size
+    assert index.timestamps[0] == START + timedelta(hours=1)
+
+def test_read_window_matches_full_scan(tmp_path):
+    """Test that seeking through the index returns exactly the entries newer than since"""
+    path = tmp_path / "app.log"
+    write_log(path, 2000)
+    since = START + timedelta(seconds=1234, milliseconds=500)
+    
+    entries = log_reader.read_window(path, since)
+    
+    assert [entry["message"] for entry in entries] == [f"entry {i}" for i in range(1235, 2000)]
+    assert log_reader.read_recent(path, max_lines=2, since=since) == entries[-2:]
+    assert len(log_reader.read_window(path, START - timedelta(days=1))) == 2000
+    assert log_reader.read_window(tmp_path / "missing.log", since) == []
+
+def write_rotated(tmp_path, count: int = 100, backups: int = 3) -> list:
+    """app.log.3.gz .. app.log.1 and app.log holding consecutive runs of entries, oldest first"""
+    names = [f"app.log.{n}" for n in range(backups, 0, -1)] + ["app.log"]
+    for i, name in enumerate(names):
+        write_log(tmp_path / name, count, start=START + timedelta(seconds=count * i))
+    for name in names[:2]:
+        with open(tmp_path / name, "rb") as src, gzip.open(tmp_path / f"{name}.gz", "wb") as dst:
+            dst.write(src.read())
+        (tmp_path / name).unlink()
+    return names
+
+def test_log_files_orders_backups_oldest_first(tmp_path):
+    """Test that rotated and gzipped backups are listed oldest first, ignoring other files"""
+    write_rotated(tmp_path)
+    (tmp_path / "app.log.old").write_text("")
+    (tmp_path / "errors.log.1").write_text("")
+    
+    names = [file.name for file in log_reader.log_files(tmp_path / "app.log")]
+    
+    assert names == ["app.log.3.gz", "app.log.2.gz", "app.log.1", "app.log"]
+
+def test_iter_entries_spans_backups_and_skips_old_files(tmp_path, monkeypatch):
+    """Test that a window crossing rotations reads only the files it overlaps, in time order"""
+    write_rotated(tmp_path)
+    opened = []
+    iter_file = log_reader._iter_file
+    
+    def recording_iter_file(path, since, until):
+        opened.append(path.name)
+        return iter_file(path, since, until)
+    
+    monkeypatch.setattr(log_reader, "_iter_file", recording_iter_file)
+    
+    entries = list(log_reader.iter_entries(tmp_path / "app.log", since=START + timedelta(seconds=149)))
+    
+    assert [entry["message"] for entry in entries] == (
+        [f"entry {i}" for i in range(50, 100)] + [f"entry {i}" for i in range(100)] * 2
+    )
+    assert opened == ["app.log.2.gz", "app.log.1", "app.log"]
+    
+    opened.clear()
+    entries = list(log_reader.iter_entries(
+        tmp_path / "app.log", since=START + timedelta(seconds=190), until=START + timedelta(seconds=210)
+    ))
+    
+    assert [entry["message"] for entry in entries] == [f"entry {i}" for i in range(91, 100)] + [f"entry {i}" for i in range(11)]
+    assert opened == ["app.log.2.gz", "app.log.1"]
+
+def test_read_recent_continues_into_backups(tmp_path):
+    """Test that the newest entries are gathered across the rotation boundary"""
+    write_rotated(tmp_path, count=10)
+    
+    entries = log_reader.read_recent(tmp_path / "app.log", max_lines=25)
+    
+    assert [entry["message"] for entry in entries] == [f"entry {i}" for i in range(5, 10)] + [f"entry {i}" for i in range(10)] * 2
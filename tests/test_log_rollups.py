@@ -0,0 +1,119 @@
+"""
+Unit tests for per-minute log rollups
+"""
+import gzip
+import json
+from datetime import datetime, timedelta
+
+import log_stats
+from log_rollups import LogTailer, RollupStore
+
+START = datetime(2024, 1, 1, 12, 0, 0)
+
+def request_entry(i: int) -> dict:
+    return {
+        "timestamp": (START + timedelta(seconds=10 * i)).isoformat(timespec="milliseconds"),
+        "level": "INFO",
+        "endpoint": f"/api/tasks/{i}",
+        "route": "/api/tasks/{task_id}" if i % 3 else "/api/tasks/",
+        "method": "GET",
+        "status_code": 500 if i % 10 == 0 else 200,
+        "duration_ms": float(i % 50 + 1),
+        "response_bytes": 100,
+        "sample_weight": 2,
+    }
+
+def append(path, entries, partial: str = ""):
+    with open(path, "a") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+        f.write(partial)
+
+def assert_matches(store: RollupStore, entries: list):
+    expected = log_stats.endpoint_stats(entries)
+    actual = store.endpoint_stats(START)
+    
+    assert set(actual) == set(expected)
+    for endpoint, stats in expected.items():
+        assert actual[endpoint].count == stats.count
+        assert actual[endpoint].errors == stats.errors
+        assert actual[endpoint].bytes == stats.bytes
+        assert actual[endpoint].durations.quantile(0.99) == stats.durations.quantile(0.99)
+
+def test_tailer_folds_new_lines_once(tmp_path):
+    """Test that repeated polls only fold complete lines appended since the last one"""
+    store = RollupStore(tmp_path / "rollups.db")
+    tailer = LogTailer(store, tmp_path / "app.log", "requests")
+    entries = [request_entry(i) for i in range(200)]
+    append(tmp_path / "app.log", entries[:120], partial='{"timestamp": "2024-01-01T12:')
+    
+    tailer.poll()
+    tailer.poll()
+    assert_matches(store, entries[:120])
+    
+    with open(tmp_path / "app.log", "a") as f:
+        f.write('20:00.000", "message": "Application started"}\n')
+    append(tmp_path / "app.log", entries[120:])
+    tailer.poll()
+    
+    assert_matches(store, entries)
+    # 200 requests over 2000 seconds: 34 minutes, a handful of rows each
+    assert sum(stats.count for stats in store.endpoint_stats(START + timedelta(minutes=30)).values()) == 2 * 20
+
+def test_tailer_follows_rotation(tmp_path):
+    """Test that lines written before a rotation are read from the backup and none are counted twice"""
+    store = RollupStore(tmp_path / "rollups.db")
+    tailer = LogTailer(store, tmp_path / "app.log", "requests")
+    entries = [request_entry(i) for i in range(90)]
+    append(tmp_path / "app.log", entries[:30])
+    tailer.poll()
+    
+    append(tmp_path / "app.log", entries[30:50])
+    (tmp_path / "app.log").rename(tmp_path / "app.log.1")
+    append(tmp_path / "app.log", entries[50:])
+    tailer.poll()
+    
+    assert_matches(store, entries)
+    
+    restarted = LogTailer(RollupStore(tmp_path / "rollups.db"), tmp_path / "app.log", "requests")
+    restarted.poll()
+    assert_matches(restarted.store, entries)
+
+def test_error_rollups(tmp_path):
+    """Test that error records are counted per module and endpoint"""
+    store = RollupStore(tmp_path / "rollups.db")
+    errors = [
+        {"timestamp": (START + timedelta(minutes=i)).isoformat(), "level": "ERROR",
+         "module": "crud" if i % 2 else "main", "endpoint": "/api/tasks/"}
+        for i in range(10)
+    ]
+    append(tmp_path / "errors.log", errors)
+    
+    LogTailer(store, tmp_path / "errors.log", "errors").poll()
+    
+    assert sorted(store.error_counts(START)) == [("crud", "/api/tasks/", 5), ("main", "/api/tasks/", 5)]
+    assert sorted(store.error_counts(START + timedelta(minutes=8))) == [
+        ("crud", "/api/tasks/", 1), ("main", "/api/tasks/", 1)
+    ]
+    assert store.endpoint_stats(START) == {}
+
+def test_tailer_reads_gzip_backup_once(tmp_path):
+    """Test that a compressed backup is folded in once however often the tailer polls"""
+    store = RollupStore(tmp_path / "rollups.db")
+    tailer = LogTailer(store, tmp_path / "app.log", "requests")
+    entries = [request_entry(i) for i in range(100)]
+    with gzip.open(tmp_path / "app.log.1.gz", "wt") as f:
+        f.writelines(json.dumps(entry) + "\n" for entry in entries)
+    
+    for _ in range(3):
+        tailer.poll()
+    assert_matches(store, entries)
+    
+    (tmp_path / "app.log").touch()
+    for _ in range(3):
+        tailer.poll()
+    assert_matches(store, entries)
+    
+    append(tmp_path / "app.log", [request_entry(100)])
+    tailer.poll()
+    assert_matches(store, entries + [request_entry(100)])
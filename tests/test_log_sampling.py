@@ -0,0 +1,53 @@
+"""
+Unit tests for request log sampling
+"""
+import random
+
+import pytest
+
+from log_sampling import RequestLogSampler
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_errors_and_slow_requests_always_kept():
+    """Test that errors and slow requests bypass sampling"""
+    sampler = RequestLogSampler(rate=0.0, slow_ms=100)
+    
+    assert sampler.sample("/api/tasks/", 500, 1.0) == 1
+    assert sampler.sample("/api/tasks/", 404, 1.0) == 1
+    assert sampler.sample("/api/tasks/", 200, 150.0) == 1
+    assert sampler.sample("/api/tasks/", 200, 1.0) is None
+
+def test_rate_sampling_weights_sum_to_request_count():
+    """Test that kept records' weights account for every fast request"""
+    sampler = RequestLogSampler(rate=0.1, rng=random.Random(7))
+    
+    weights = [sampler.sample("/api/tasks/", 200, 1.0) for _ in range(1000)]
+    kept = [weight for weight in weights if weight is not None]
+    
+    last_kept = max(i for i, weight in enumerate(weights) if weight is not None)
+    
+    assert 50 < len(kept) < 150
+    # Requests after the last kept record are carried to the next one
+    assert sum(kept) + (len(weights) - 1 - last_kept) == 1000
+
+def test_budget_limits_records_per_route():
+    """Test that the token budget caps records per second, separately per route"""
+    clock = FakeClock()
+    sampler = RequestLogSampler(budget_per_second=2, clock=clock)
+    
+    assert [sampler.sample("/a", 200, 1.0) for _ in range(4)] == [1, 1, None, None]
+    assert sampler.sample("/b", 200, 1.0) == 1
+    clock.now = 0.5
+    assert sampler.sample("/a", 200, 1.0) == 3
+    assert sampler.stats()["skipped"] == 2
+
+def test_invalid_rate_rejected():
+    """Test that rates outside [0, 1] fail loudly"""
+    with pytest.raises(ValueError):
+        RequestLogSampler(rate=1.5)
@@ -0,0 +1,64 @@
+"""
+Unit tests for parallel chunked log scans
+"""
+import gzip
+import json
+from datetime import datetime, timedelta
+
+import log_reader
+import log_scan
+import log_stats
+
+START = datetime(2024, 1, 1, 12, 0, 0)
+
+def write_requests(path, count: int, offset: int = 0):
+    with open(path, "w") as f:
+        for i in range(offset, offset + count):
+            f.write(json.dumps({
+                "timestamp": (START + timedelta(seconds=i)).isoformat(timespec="milliseconds"),
+                "endpoint": f"/api/tasks/{i}",
+                "route": f"/api/route/{i % 7}",
+                "status_code": 500 if i % 13 == 0 else 200,
+                "duration_ms": float(i % 97 + 1),
+                "sample_weight": 1 + i % 3,
+            }) + "\n")
+
+def test_byte_ranges_are_line_aligned(tmp_path):
+    """Test that ranges tile the file from start and every boundary is a line start"""
+    path = tmp_path / "app.log"
+    write_requests(path, 500)
+    data = path.read_bytes()
+    start = data.index(b"\n", 1000) + 1
+    
+    ranges = log_scan.byte_ranges(path, start, chunk_bytes=4096)
+    
+    assert len(ranges) > 5
+    assert ranges[0][1] == start and ranges[-1][2] == len(data)
+    for (_, _, end), (_, next_start, _) in zip(ranges, ranges[1:]):
+        assert end == next_start and data[end - 1:end] == b"\n"
+
+def test_scan_matches_serial_read_across_backups(tmp_path, monkeypatch):
+    """Test that chunks parsed in worker processes merge to the same stats as a serial read"""
+    write_requests(tmp_path / "app.log.2", 1000)
+    write_requests(tmp_path / "app.log.1", 1000, offset=1000)
+    write_requests(tmp_path / "app.log", 1000, offset=2000)
+    with open(tmp_path / "app.log.2", "rb") as src, gzip.open(tmp_path / "app.log.2.gz", "wb") as dst:
+        dst.write(src.read())
+    (tmp_path / "app.log.2").unlink()
+    monkeypatch.setattr(log_scan, "PARALLEL_MIN_BYTES", 0)
+    monkeypatch.setattr(log_scan, "SCAN_WORKERS", 2)
+    since = START + timedelta(seconds=500)
+    until = START + timedelta(seconds=2500)
+    
+    with log_scan.make_executor() as executor:
+        scanned = log_scan.scan_endpoint_stats(
+            tmp_path / "app.log", since, until, executor=executor, chunk_bytes=16384
+        )
+    expected = log_stats.endpoint_stats(log_reader.iter_entries(tmp_path / "app.log", since, until))
+    
+    assert set(scanned) == set(expected)
+    for endpoint, stats in expected.items():
+        assert scanned[endpoint].count == stats.count
+        assert scanned[endpoint].errors == stats.errors
+        assert scanned[endpoint].durations.count == stats.durations.count
+        assert scanned[endpoint].durations.quantile(0.95) == stats.durations.quantile(0.95)
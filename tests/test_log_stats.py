@@ -0,0 +1,76 @@
+"""
+Unit tests for per-endpoint statistics and the quantile sketch
+"""
+import json
+import random
+
+import pytest
+
+from log_stats import QuantileSketch, endpoint_stats
+
+def exact_quantile(values, q):
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))]
+
+def test_sketch_quantiles_within_relative_accuracy():
+    """Test that every reported percentile is within 1% of the exact value"""
+    rng = random.Random(7)
+    values = [rng.lognormvariate(3, 1.5) for _ in range(20000)]
+    sketch = QuantileSketch()
+    for value in values:
+        sketch.add(value)
+    
+    for q in (0.5, 0.9, 0.95, 0.99):
+        assert sketch.quantile(q) == pytest.approx(exact_quantile(values, q), rel=0.011)
+    assert sketch.count == 20000
+    assert sketch.max == max(values)
+    assert QuantileSketch().quantile(0.5) is None
+
+def test_sketch_merge_and_round_trip():
+    """Test that merged sketches equal one sketch of all values and survive JSON serialization"""
+    rng = random.Random(3)
+    values = [rng.expovariate(0.01) for _ in range(5000)]
+    whole, first, second = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for i, value in enumerate(values):
+        whole.add(value)
+        (first if i % 2 else second).add(value)
+    
+    first.merge(second)
+    restored = QuantileSketch.from_dict(json.loads(json.dumps(first.to_dict())))
+    
+    for q in (0.5, 0.99):
+        assert restored.quantile(q) == whole.quantile(q)
+    assert restored.count == whole.count
+    with pytest.raises(ValueError):
+        first.merge(QuantileSketch(relative_accuracy=0.05))
+
+def test_sketch_memory_is_bounded():
+    """Test that bucket count stays capped and high quantiles stay accurate"""
+    sketch = QuantileSketch(max_buckets=64)
+    values = [1.1 ** i for i in range(500)]
+    for value in values:
+        sketch.add(value)
+    
+    assert len(sketch.buckets) <= 64
+    assert sketch.quantile(0.99) == pytest.approx(exact_quantile(values, 0.99), rel=0.011)
+
+def test_endpoint_stats_weights_samples():
+    """Test that records are grouped by route and weighted by sample_weight"""
+    entries = [
+        {"endpoint": "/api/tasks/1", "route": "/api/tasks/{task_id}", "duration_ms": 10.0, "status_code": 200, "sample_weight": 9},
+        {"endpoint": "/api/tasks/2", "route": "/api/tasks/{task_id}", "duration_ms": 900.0, "status_code": 500, "level": "ERROR"},
+        {"endpoint": "/health", "duration_ms": 1.0, "status_code": 200},
+        {"message": "Application started"},
+    ]
+    
+    stats = endpoint_stats(entries)
+    
+    assert set(stats) == {"/api/tasks/{task_id}", "/health"}
+    task_stats = stats["/api/tasks/{task_id}"]
+    assert task_stats.count == 10
+    assert task_stats.error_rate == pytest.approx(10.0)
+    percentiles = task_stats.percentiles()
+    assert percentiles[50] == pytest.approx(10.0, rel=0.01)
+    # One slow request in ten estimated ones stays out of p99 but not max
+    assert percentiles[99] == pytest.approx(10.0, rel=0.01)
+    assert task_stats.durations.max == 900.0
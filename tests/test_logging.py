@@ -0,0 +1,100 @@
+"""
+Unit tests for the queued logging pipeline
+"""
+import json
+import logging
+import queue
+import threading
+from datetime import datetime
+
+import pytest
+
+from logging_config import BoundedQueueHandler, DrainingQueueListener, JSONFormatter, request_id_var
+
+class SlowHandler(logging.Handler):
+    """Collects messages, optionally waiting for a gate before each write"""
+
+    def __init__(self, gate: threading.Event = None):
+        super().__init__()
+        self.gate = gate
+        self.messages = []
+
+    def emit(self, record):
+        if self.gate is not None:
+            self.gate.wait()
+        self.messages.append(record.getMessage())
+
+def make_logger(handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger(f"test_logging.{id(handler)}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    return logger
+
+def test_drop_policy_counts_overflow():
+    """Test that a full queue drops records instead of blocking the caller"""
+    handler = BoundedQueueHandler(queue.Queue(2), policy="drop")
+    logger = make_logger(handler)
+    
+    for i in range(5):
+        logger.info("record %d", i)
+    
+    assert handler.stats() == {"policy": "drop", "capacity": 2, "queued": 2, "dropped": 3}
+
+def test_block_policy_delivers_everything_and_stop_drains():
+    """Test that blocking waits for the writer and stop() writes out queued records"""
+    gate = threading.Event()
+    target = SlowHandler(gate)
+    log_queue = queue.Queue(2)
+    handler = BoundedQueueHandler(log_queue, policy="block")
+    listener = DrainingQueueListener(log_queue, target)
+    listener.start()
+    logger = make_logger(handler)
+    
+    writer = threading.Thread(target=lambda: [logger.info("record %d", i) for i in range(20)])
+    writer.start()
+    gate.set()
+    writer.join(timeout=5)
+    listener.stop()
+    
+    assert target.messages == [f"record {i}" for i in range(20)]
+    assert handler.dropped == 0
+
+def test_unknown_policy_rejected():
+    """Test that a misspelled LOG_QUEUE_POLICY fails loudly"""
+    with pytest.raises(ValueError):
+        BoundedQueueHandler(queue.Queue(1), policy="discard")
+
+def test_json_formatter_shape():
+    """Test that queued records format as the JSON lines the analytics server reads"""
+    log_queue = queue.Queue()
+    logger = make_logger(BoundedQueueHandler(log_queue))
+    token = request_id_var.set("req-123")
+    try:
+        logger.info("Request completed: %s", "GET /api/tasks/",
+                    extra={"endpoint": "/api/tasks/", "status_code": 200, "duration_ms": 1.5})
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            logger.error("Request failed", exc_info=True)
+    finally:
+        request_id_var.reset(token)
+    
+    formatter = JSONFormatter()
+    info, error = (json.loads(formatter.format(log_queue.get_nowait())) for _ in range(2))
+    
+    assert info["message"] == "Request completed: GET /api/tasks/"
+    assert (info["level"], info["module"], info["request_id"]) == ("INFO", "test_logging", "req-123")
+    assert (info["endpoint"], info["status_code"], info["duration_ms"]) == ("/api/tasks/", 200, 1.5)
+    assert datetime.fromisoformat(info["timestamp"]).tzinfo is None
+    assert "exception" not in info
+    assert error["message"] == "Request failed"
+    assert "RuntimeError: boom" in error["exception"]
+
+def test_json_formatter_encodes_once_per_record():
+    """Test that every handler reuses the first encoding of a record"""
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "hello", (), None)
+    first = JSONFormatter().format(record)
+    record.msg = "changed"
+    
+    assert JSONFormatter().format(record) is first
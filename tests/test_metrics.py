@@ -0,0 +1,83 @@
+"""
+Unit tests for the Prometheus metrics registry
+"""
+import asyncio
+import json
+import threading
+
+from sqlalchemy import create_engine, text
+from starlette.concurrency import run_in_threadpool
+
+import metrics
+
+def test_thread_shards_merge_on_snapshot():
+    """Test that counts recorded on several threads add up"""
+    registry = metrics.MetricsRegistry()
+    
+    def work():
+        for _ in range(1000):
+            registry.inc("http_requests_total", 'route="/a"')
+            registry.observe("http_request_duration_seconds", 'route="/a"', 0.02)
+    
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    snapshot = registry.snapshot()
+    assert snapshot["values"][("http_requests_total", 'route="/a"')] == 4000
+    counts = snapshot["histograms"][("http_request_duration_seconds", 'route="/a"')]
+    assert counts[metrics.LATENCY_BUCKETS.index(0.025)] == 4000
+    assert round(counts[-1], 6) == 80.0
+
+def test_render_exposition_format():
+    """Test histogram buckets are cumulative and labels are escaped"""
+    snapshot = {"values": {("http_requests_total", metrics.labels(route='/a"b', status=200)): 3}, "histograms": {
+        ("http_response_size_bytes", 'route="/a"'): [1, 2] + [0] * (len(metrics.SIZE_BUCKETS) - 1) + [2500.0],
+    }}
+    
+    text_output = metrics.render(snapshot, {"threadpool_threads_max": 40})
+    
+    assert 'http_requests_total{route="/a\\"b",status="200"} 3' in text_output
+    assert 'http_response_size_bytes_bucket{route="/a",le="100.0"} 1' in text_output
+    assert 'http_response_size_bytes_bucket{route="/a",le="+Inf"} 3' in text_output
+    assert 'http_response_size_bytes_sum{route="/a"} 2500' in text_output
+    assert "threadpool_threads_max 40" in text_output
+    assert "# TYPE http_request_duration_seconds histogram" in text_output
+
+def test_collect_merges_worker_snapshots(tmp_path):
+    """Test that other workers' counters are added and dead workers' gauges dropped"""
+    before = metrics.collect(str(tmp_path))["values"].get(("db_queries_total", 'route="/a"'), 0)
+    (tmp_path / "metrics_999999999.json").write_text(json.dumps({
+        "values": [["db_queries_total", 'route="/a"', 5], ["http_requests_in_flight", 'route="/a"', 2]],
+        "histograms": [],
+    }))
+    metrics.write_snapshot(str(tmp_path))
+    
+    values = metrics.collect(str(tmp_path))["values"]
+    
+    assert values[("db_queries_total", 'route="/a"')] == before + 5
+    assert ("http_requests_in_flight", 'route="/a"') not in values
+
+def test_query_counting_follows_context(tmp_path):
+    """Test that statements run on a threadpool worker count toward the request that started them"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'metrics.db'}")
+    metrics.instrument_engine(engine)
+    
+    def query():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    
+    async def run():
+        counter, token = metrics.count_queries()
+        try:
+            query()
+            await run_in_threadpool(query)
+            await run_in_threadpool(query)
+        finally:
+            metrics.reset_query_count(token)
+        return counter[0]
+    
+    assert asyncio.run(run()) == 3
+    engine.dispose()
@@ -0,0 +1,157 @@
+"""
+Tests for schema migrations and query plans
+"""
+import pytest
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.orm import sessionmaker
+from database import init_db
+import crud
+import migrations
+import models
+import schemas
+
+@pytest.fixture
+def engine(tmp_path):
+    """Engine on a database file private to the test"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test_migrations.db'}", connect_args={"check_same_thread": False})
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def db(engine):
+    """Create a fresh, fully migrated database for each test"""
+    init_db(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def test_upgrade_adds_indexes_to_existing_tables(db, engine):
+    """Test that a database created before the indexes existed gets them"""
+    added = {
+        "ix_tasks_owner_id", "ix_tasks_owner_id_priority", "ix_tasks_owner_id_completed",
+        "ix_tasks_priority", "ix_tasks_completed",
+    }
+    with engine.begin() as conn:
+        for name in added:
+            conn.exec_driver_sql(f"DROP INDEX {name}")
+        conn.exec_driver_sql("PRAGMA user_version = 0")
+
+    version = migrations.upgrade(engine)
+
+    assert version == migrations.MIGRATIONS[-1][0]
+    indexes = {index["name"]: index for index in inspect(engine).get_indexes("tasks")}
+    assert added <= set(indexes)
+    assert indexes["ix_tasks_owner_id_priority"]["column_names"] == ["owner_id", "priority"]
+    assert {index.name for index in models.Task.__table__.indexes} <= set(indexes)
+
+def test_upgrade_backfills_task_counters(db, engine):
+    """Test that databases from before the counters table get it populated and kept current by triggers"""
+    user = crud.create_user(db, schemas.UserCreate(
+        email="backfill@example.com", username="backfill", password="pass"
+    ))
+    user_id = user.id
+    crud.create_tasks_bulk(db, [schemas.TaskCreate(title=f"Old{i}", completed=i % 2 == 0) for i in range(5)], user_id)
+    db.close()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE task_counters")
+        for trigger in ("task_counters_insert", "task_counters_delete", "task_counters_update"):
+            conn.exec_driver_sql(f"DROP TRIGGER {trigger}")
+        conn.exec_driver_sql("PRAGMA user_version = 1")
+
+    migrations.upgrade(engine)
+
+    with engine.connect() as conn:
+        triggers = set(conn.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'tasks'"
+        ).scalars())
+    assert {"task_counters_insert", "task_counters_delete", "task_counters_update"} <= triggers
+    counts = crud.get_task_counts(db, user_id=user_id)
+    assert (counts.total, counts.completed, counts.pending) == (5, 3, 2)
+    
+    crud.create_task(db, schemas.TaskCreate(title="New"), user_id)
+    assert crud.get_task_counts(db, user_id=user_id).total == 6
+
+def test_upgrade_builds_search_index(db, engine):
+    """Test that databases from before full-text search get existing tasks indexed"""
+    user = crud.create_user(db, schemas.UserCreate(
+        email="indexed@example.com", username="indexed", password="pass"
+    ))
+    user_id = user.id
+    crud.create_task(db, schemas.TaskCreate(title="Quarterly report"), user_id)
+    db.close()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE tasks_fts")
+        conn.exec_driver_sql("PRAGMA user_version = 2")
+    
+    migrations.upgrade(engine)
+    crud.create_task(db, schemas.TaskCreate(title="Annual report"), user_id)
+    
+    assert len(crud.search_tasks(db, "report", user_id=user_id)) == 2
+
+def test_upgrade_is_idempotent(db, engine):
+    """Test that running migrations twice leaves the version unchanged"""
+    first = migrations.upgrade(engine)
+    second = migrations.upgrade(engine)
+    assert first == second
+
+def test_crud_queries_use_indexes(db, engine):
+    """Test that every filtered crud query is planned as an index search"""
+    user = crud.create_user(db, schemas.UserCreate(
+        email="plans@example.com", username="plans", password="pass"
+    ))
+    task = crud.create_task(db, schemas.TaskCreate(title="Plan"), user.id)
+    filters = [
+        schemas.TaskFilter(owner_id=user.id),
+        schemas.TaskFilter(priority="high"),
+        schemas.TaskFilter(completed=True),
+        schemas.TaskFilter(owner_id=user.id, completed=False),
+        schemas.TaskFilter(priority="low", completed=True),
+        schemas.TaskFilter(owner_id=user.id, priority="low", completed=True),
+    ]
+
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            statements.append((statement, parameters))
+
+    try:
+        crud.get_user(db, user.id)
+        crud.get_user_by_email(db, user.email)
+        crud.get_user_by_username(db, user.username)
+        crud.get_users(db, after_id=0)
+        crud.get_task(db, task.id)
+        crud.get_tasks(db, user_id=user.id)
+        crud.get_tasks(db, after_id=0)
+        crud.get_tasks(db, user_id=user.id, after_id=0)
+        crud.get_tasks_by_priority(db, "high")
+        crud.get_tasks_by_priority(db, "high", user_id=user.id)
+        crud.search_tasks(db, "plan")
+        crud.search_tasks(db, "plan", user_id=user.id)
+        crud.get_task_counts(db)
+        crud.get_task_counts(db, user_id=user.id)
+        crud.get_completed_tasks_count(db)
+        crud.get_completed_tasks_count(db, user_id=user.id)
+        for task_filter in filters:
+            list(crud.stream_tasks(db, task_filter))
+            crud.bulk_update_tasks(db, schemas.TaskUpdate(description="planned"), task_filter=task_filter)
+            crud.bulk_delete_tasks(db, task_filter=task_filter)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    assert statements
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+            details = [row[-1] for row in plan]
+            # task_counters is bounded by owners x priorities, not by task volume,
+            # and search results are ranked by bm25, which no index can order
+            bounded = "task_counters" in statement and "tasks." not in statement
+            for detail in details:
+                if detail.startswith("SCAN") and not bounded:
+                    assert "VIRTUAL TABLE" in detail, f"Full scan in {statement!r}: {details}"
+                if "TEMP B-TREE" in detail:
+                    assert bounded or "bm25" in statement, f"Sort without index in {statement!r}: {details}"
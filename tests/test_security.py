@@ -0,0 +1,42 @@
+"""
+Tests for password hashing
+"""
+import asyncio
+import security
+
+def test_hash_rounds_follow_configuration():
+    """Test that hashes use the configured bcrypt cost"""
+    hashed = security.hash_password("secret")
+    assert hashed.startswith(f"$2b${security.BCRYPT_ROUNDS:02d}$")
+    assert security.verify_password("secret", hashed)
+
+def test_async_hashing_in_process_pool():
+    """Test hashing and verifying through the hasher pool records queue metrics"""
+    security.hasher_stats.reset()
+    
+    async def run():
+        hashed = await security.hash_password_async("secret")
+        return hashed, await asyncio.gather(
+            security.verify_password_async("secret", hashed),
+            security.verify_password_async("wrong", hashed),
+        )
+    
+    try:
+        hashed, (valid, invalid) = asyncio.run(run())
+    finally:
+        security.shutdown_hasher()
+    
+    assert valid is True
+    assert invalid is False
+    stats = security.hasher_stats.snapshot()
+    assert stats["jobs"] == 3
+    assert stats["queue_wait_ms_max"] >= 0
+
+def test_hasher_pool_is_not_forked():
+    """Test that hasher workers start from a clean process rather than a fork of the threaded API"""
+    try:
+        executor = security._get_executor()
+        assert executor._mp_context.get_start_method() in ("forkserver", "spawn")
+        assert executor.submit(security.verify_password, "secret", security.hash_password("secret")).result()
+    finally:
+        security.shutdown_hasher()